@@ -14,6 +14,9 @@ class SpellingDictator {
         this.selectedVoice = null;
         this.currentMode = 'random';
         this.audioCache = {}; // Cache for audio elements
+        this.audioBundles = {}; // Per-grade bundle downloads (see scripts/build_bundle.py)
+        this.loadedBundles = {}; // Bundles that finished downloading, by grade
+        this.audioDurations = null; // Durations (ms) of files known to be intact (see scripts/scan_audio.py)
         this.currentAudio = null; // Track currently playing audio
         this.usePreGeneratedAudio = true; // Try pre-generated audio first
 
@@ -21,6 +24,53 @@ class SpellingDictator {
         this.initEventListeners();
         this.loadVoices();
         this.initWordSelector();
+        this.registerServiceWorker();
+        this.loadAudioDurations();
+    }
+
+    registerServiceWorker() {
+        // Offline support: sw.js precaches the app shell (see scripts/build_assets.py).
+        // Service workers need http(s), so this is skipped when opened from file://
+        this.serviceWorkerReady = Promise.resolve(null);
+        if (!('serviceWorker' in navigator) || location.protocol === 'file:') return;
+        this.serviceWorkerReady = navigator.serviceWorker.register('sw.js')
+            .then(() => Promise.race([
+                navigator.serviceWorker.ready,
+                new Promise(resolve => setTimeout(() => resolve(null), 3000))
+            ]))
+            .catch(() => null);
+    }
+
+    loadAudioDurations() {
+        // audio/durations.json lists every intact audio file with its duration; optional
+        fetch('audio/durations.json')
+            .then(response => (response.ok ? response.json() : null))
+            .then(index => { this.audioDurations = index; })
+            .catch(() => {});
+    }
+
+    getAudioDuration(word) {
+        // Duration in ms of the word's audio file, or undefined if it is not known to be intact
+        const grade = this.audioDurations && this.audioDurations[this.gradeLevelSelect.value];
+        return grade ? grade[this.sanitizeFilename(word)] : undefined;
+    }
+
+    async warmGradeAudio(gradeLevel) {
+        // Ask the service worker to cache the whole grade's audio; resolves once it has, to
+        // {url: cache key} for the cached files, or to null without a service worker
+        const registration = await this.serviceWorkerReady;
+        if (!registration || !registration.active) return null;
+        return new Promise((resolve) => {
+            const channel = new MessageChannel();
+            channel.port1.onmessage = (event) => resolve(event.data.cached || null);
+            registration.active.postMessage({ type: 'warm-grade', gradeLevel }, [channel.port2]);
+        });
+    }
+
+    async fetchAudioAsset(url, cached) {
+        // Read from the service worker's cache when it holds the file, so it is downloaded once
+        const response = cached && cached[url] && await caches.match(cached[url]);
+        return response || fetch(url);
     }
 
     initElements() {
@@ -415,6 +465,9 @@ class SpellingDictator {
         this.currentIndex = 0;
         this.isPaused = false;
 
+        // Warm the grade's audio bundle (cached for offline use) while the first word loads
+        this.loadAudioBundle(this.gradeLevelSelect.value);
+
         // Update UI
         this.showDictationPanel();
         this.totalWordsSpan.textContent = this.selectedWords.length;
@@ -473,7 +526,14 @@ class SpellingDictator {
 
         // Schedule the word to be repeated halfway through the interval
         const interval = parseInt(this.intervalInput.value);
-        const halfwayTime = (interval * 1000) / 2; // Convert to milliseconds and divide by 2
+        let halfwayTime = (interval * 1000) / 2; // Convert to milliseconds and divide by 2
+
+        // Don't start the repeat before the first playback has finished (when the duration is known)
+        const duration = this.getAudioDuration(word);
+        if (duration) {
+            const playTime = duration / parseFloat(this.speedInput.value);
+            halfwayTime = Math.max(halfwayTime, Math.min(playTime + 500, interval * 1000 - playTime));
+        }
 
         this.halfwayTimeoutId = setTimeout(() => {
             if (!this.isPaused) {
@@ -498,6 +558,50 @@ class SpellingDictator {
         return `audio/${gradeLevel}/${sanitized}.mp3`;
     }
 
+    loadAudioBundle(gradeLevel) {
+        // Fetch audio/<grade>.bundle.mp3 and its index once; resolves to null if unavailable
+        // (e.g. bundles not built, or opened from file:// where fetch is blocked).
+        // With a service worker, it downloads the grade's audio and the page then reads the
+        // bundle from its cache, rather than both downloading it at the same time
+        if (!(gradeLevel in this.audioBundles)) {
+            this.audioBundles[gradeLevel] = (async () => {
+                try {
+                    const cached = await this.warmGradeAudio(gradeLevel);
+                    const indexResponse = await this.fetchAudioAsset(`audio/${gradeLevel}.index.json`, cached);
+                    if (!indexResponse.ok) return null;
+                    const index = await indexResponse.json();
+                    const bundleResponse = await this.fetchAudioAsset(`audio/${index.bundle}`, cached);
+                    if (!bundleResponse.ok) return null;
+                    // Kept as one Blob: slices of it share its bytes instead of copying them
+                    const blob = await bundleResponse.blob();
+                    this.loadedBundles[gradeLevel] = { words: index.words, blob };
+                    return this.loadedBundles[gradeLevel];
+                } catch (error) {
+                    return null;
+                }
+            })();
+        }
+        return this.audioBundles[gradeLevel];
+    }
+
+    getAudioSource(word) {
+        // Use a slice of the grade bundle once it has downloaded; until then fetch the per-word file
+        const gradeLevel = this.gradeLevelSelect.value;
+        this.loadAudioBundle(gradeLevel);
+        const bundle = this.loadedBundles[gradeLevel];
+        const entry = bundle && bundle.words[this.sanitizeFilename(word)];
+        if (entry) {
+            const [offset, length] = entry;
+            return URL.createObjectURL(bundle.blob.slice(offset, offset + length, 'audio/mpeg'));
+        }
+        return this.getAudioPath(word);
+    }
+
+    releaseAudio(audio) {
+        // Free the object URL of an audio element made from a bundle slice
+        if (audio && audio.src.startsWith('blob:')) URL.revokeObjectURL(audio.src);
+    }
+
     async speak(text) {
         // Stop any currently playing audio
         if (this.currentAudio) {
@@ -509,22 +613,25 @@ class SpellingDictator {
         this.synth.cancel();
 
         if (this.usePreGeneratedAudio) {
+            const audioPath = this.getAudioPath(text);
+            let audio = null;
             try {
-                const audioPath = this.getAudioPath(text);
-
                 // Check if audio is already cached
                 if (this.audioCache[audioPath]) {
                     this.currentAudio = this.audioCache[audioPath];
                 } else {
                     // Create new audio element
-                    const audio = new Audio(audioPath);
-
-                    // Wait for audio to load to verify it exists
-                    await new Promise((resolve, reject) => {
-                        audio.addEventListener('canplaythrough', resolve, { once: true });
-                        audio.addEventListener('error', reject, { once: true });
-                        audio.load();
-                    });
+                    audio = new Audio(this.getAudioSource(text));
+
+                    // Wait for audio to load to verify it exists, unless the duration index vouches for it
+                    // (a failed play() below still falls back to Web Speech)
+                    if (this.getAudioDuration(text) === undefined) {
+                        await new Promise((resolve, reject) => {
+                            audio.addEventListener('canplaythrough', resolve, { once: true });
+                            audio.addEventListener('error', reject, { once: true });
+                            audio.load();
+                        });
+                    }
 
                     // Cache the audio element
                     this.audioCache[audioPath] = audio;
@@ -538,6 +645,8 @@ class SpellingDictator {
                 await this.currentAudio.play();
                 return;
             } catch (error) {
+                this.releaseAudio(this.audioCache[audioPath] || audio);
+                delete this.audioCache[audioPath];
                 console.warn(`Pre-generated audio not found for "${text}", falling back to Web Speech API`, error);
                 // Fall through to Web Speech API fallback
             }
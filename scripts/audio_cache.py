@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Content-addressed build cache for generated audio.
+
+Each synthesized file is recorded in a manifest (audio/manifest.json) under a
+hash of everything that affects the audio: text, voice, language, speaking
+rate and encoding. A later run only re-synthesizes files whose hash changed or
+whose file is missing/damaged, so fixing one word costs one request instead of
+a full rebuild.
+
+Files and the manifest itself are written atomically (temp file + rename), so
+an interrupted run never leaves a half-written MP3 behind and simply resumes
+where it stopped.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+TEMP_SUFFIX = '.tmp'
+
+# mkstemp creates 0600 files; published audio should get the usual permissions
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def cache_key(text, voice_name, language_code, speaking_rate, encoding):
+    """Hash the synthesis parameters that determine the audio content."""
+    payload = json.dumps([text, voice_name, language_code, speaking_rate, encoding])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+@contextmanager
+def atomic_output(path):
+    """Open a temp file next to `path` for writing; rename it into place on success."""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix=TEMP_SUFFIX)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            yield out
+            out.flush()
+            # Set the mode on the open file, so the fsync below makes it durable with the data
+            os.fchmod(out.fileno(), 0o666 & ~_UMASK)
+            os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_atomic(path, data):
+    """Write `data` to `path` via a temp file in the same directory and a rename.
+
+    The file gets the permissions open() would give it (0666 less the umask),
+    not mkstemp's 0600, so a web server running as another user can read it.
+    """
+    with atomic_output(path) as out:
+        out.write(data)
+
+
+def link_atomic(source, path):
+    """Hard-link `source` to `path` (replacing it), copying if links are unsupported."""
+    path = Path(path)
+    if path.exists() and os.path.samefile(source, path):
+        return
+    tmp_path = path.with_name(f'.{path.name}.link{TEMP_SUFFIX}')
+    try:
+        os.link(source, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        write_atomic(path, Path(source).read_bytes())
+
+
+def remove_stale_temp_files(directory):
+    """Delete temp files left behind by a run that was killed mid-write."""
+    removed = 0
+    for tmp in Path(directory).rglob(f'.*{TEMP_SUFFIX}'):
+        tmp.unlink()
+        removed += 1
+    return removed
+
+
+class BuildManifest:
+    """Manifest of generated files, keyed by cache_key().
+
+    Layout::
+
+        {"version": 1,
+         "entries": {"<key>": {"text": ..., "voice": ..., "files": {"gr23/atom.mp3": 8640}}}}
+
+    File paths are relative to the manifest's directory; the value is the
+    size written, used to detect truncated or replaced files.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.root = self.path.parent
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._dirty = 0
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.entries = data.get('entries', {})
+        # Reverse index so a file can be moved off a stale key when it is rebuilt
+        self._owners = {rel: key for key, entry in self.entries.items() for rel in entry['files']}
+
+    def _relative(self, output_path):
+        return Path(output_path).resolve().relative_to(self.root.resolve()).as_posix()
+
+    def is_fresh(self, key, output_path):
+        """True if `output_path` was built from `key` and is still intact on disk."""
+        rel = self._relative(output_path)
+        with self._lock:
+            entry = self.entries.get(key)
+            expected = entry['files'].get(rel) if entry else None
+        if expected is None:
+            return False
+        try:
+            return Path(output_path).stat().st_size == expected
+        except FileNotFoundError:
+            return False
+
+    def record(self, key, output_path, text, voice_name, size):
+        """Record that `output_path` now holds the audio for `key`."""
+        rel = self._relative(output_path)
+        with self._lock:
+            old_key = self._owners.get(rel)
+            if old_key is not None and old_key != key:
+                old_entry = self.entries.get(old_key)
+                if old_entry:
+                    old_entry['files'].pop(rel, None)
+                    if not old_entry['files']:
+                        del self.entries[old_key]
+            entry = self.entries.setdefault(key, {'text': text, 'voice': voice_name, 'files': {}})
+            entry['files'][rel] = size
+            self._owners[rel] = key
+            self._dirty += 1
+
+    def refresh(self, output_path, size):
+        """Update the recorded size of a file rewritten in place (e.g. by postprocess_audio.py)."""
+        rel = self._relative(output_path)
+        with self._lock:
+            key = self._owners.get(rel)
+            if key is None:
+                return
+            self.entries[key]['files'][rel] = size
+            self._dirty += 1
+
+    def save(self, every=1):
+        """Write the manifest atomically once at least `every` changes are pending."""
+        with self._lock:
+            if self._dirty < every or self._dirty == 0:
+                return
+            data = json.dumps({'version': MANIFEST_VERSION, 'entries': self.entries},
+                              indent=1, sort_keys=True)
+            self._dirty = 0
+            write_atomic(self.path, data.encode('utf-8'))
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Benchmark the audio generation and PDF extraction pipelines offline.
+
+Generation scenarios drive generate_audio.main() and generate_audio_for_word()
+against the in-process FakeTTSBackend with configurable latency, jitter and
+error rate. Extraction scenarios run extract_pdf.py over generated multi-page
+PDFs of increasing size (skipped if PyPDF2 is not installed).
+
+Each scenario runs in a fresh process so peak RSS is measured per scenario.
+Reported per scenario: words/second, p50/p95/p99 request latency, peak RSS and
+bytes written. Results are saved as JSON; pass --compare with an earlier
+result file to print the change per scenario.
+
+Usage:
+    python benchmark.py [--latency 0.05] [--jitter 0.02] [--error-rate 0.01]
+                        [--workers 1 8 32] [--batch-sizes 1 40] [--pdf-pages 10 100 500]
+                        [--output results.json] [--compare previous.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import generate_audio
+from metrics import latency_summary
+from tts_backends import FakeTTSBackend
+
+
+class TimedBackend:
+    """Wrap a backend and record the latency of every request."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def _timed(self, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.latencies.append(elapsed)
+
+    def synthesize(self, text, voice_name, **kwargs):
+        return self._timed(self.backend.synthesize, text, voice_name, **kwargs)
+
+    def synthesize_marked(self, ssml, voice_name, **kwargs):
+        return self._timed(self.backend.synthesize_marked, ssml, voice_name, **kwargs)
+
+
+def peak_rss():
+    """Peak RSS of this process and of its largest finished child (e.g. PDF page workers).
+
+    ru_maxrss is in kilobytes on Linux. peak_rss_bytes is the larger of the
+    two, so single- and multi-process runs are comparable.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+    return {
+        'peak_rss_bytes': max(own, children),
+        'peak_rss_self_bytes': own,
+        'peak_rss_children_bytes': children,
+    }
+
+
+def directory_bytes(path):
+    return sum(f.stat().st_size for f in Path(path).rglob('*') if f.is_file())
+
+
+def bench_generate_main(config):
+    """Full generate_audio.main() run over both grade lists."""
+    backend = TimedBackend(FakeTTSBackend(latency=config['latency'], jitter=config['jitter'],
+                                          error_rate=config['error_rate'], seed=0))
+    words = len(generate_audio.SPELLING_WORDS_GR23) + len(generate_audio.SPELLING_WORDS_GR45)
+    with tempfile.TemporaryDirectory() as out:
+        argv = ['--output-dir', out, '--force',
+                '--workers', str(config['workers']), '--batch-size', str(config['batch_size'])]
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_audio.main(argv, backend=backend)
+        elapsed = time.perf_counter() - start
+        written = directory_bytes(out)
+    return {
+        'words': words,
+        'seconds': round(elapsed, 3),
+        'words_per_second': round(words / elapsed, 1),
+        **latency_summary(backend.latencies),
+        'bytes_written': written,
+        **peak_rss(),
+    }
+
+
+def bench_generate_word(config):
+    """Sequential generate_audio_for_word() calls: per-word overhead."""
+    backend = TimedBackend(FakeTTSBackend(latency=config['latency'], jitter=config['jitter'], seed=0))
+    words = generate_audio.SPELLING_WORDS_GR23[:config['words']]
+    with tempfile.TemporaryDirectory() as out:
+        start = time.perf_counter()
+        for word in words:
+            path = Path(out) / (generate_audio.sanitize_filename(word) + '.mp3')
+            generate_audio.generate_audio_for_word(backend, word, 'en-US-Standard-C', path)
+        elapsed = time.perf_counter() - start
+        written = directory_bytes(out)
+    return {
+        'words': len(words),
+        'seconds': round(elapsed, 3),
+        'words_per_second': round(len(words) / elapsed, 1),
+        **latency_summary(backend.latencies),
+        'bytes_written': written,
+        **peak_rss(),
+    }
+
+
+def pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_test_pdf(path, pages, words_per_page=40):
+    """Write a plain multi-page PDF of numbered spelling words (no dependencies)."""
+    words = generate_audio.SPELLING_WORDS_GR23 + generate_audio.SPELLING_WORDS_GR45
+    objects = []
+    page_ids = []
+    # Object 1: catalog, 2: page tree, 3: font; pages and contents follow
+    font_id = 3
+    next_id = 4
+    for page in range(pages):
+        lines = ['Grades 4-5' if page % 2 else 'Grades 2-3']
+        for i in range(words_per_page):
+            n = page * words_per_page + i
+            lines.append(f'{n + 1}. {words[n % len(words)]}')
+        text = ' T* '.join(f'({pdf_escape(line)}) Tj' for line in lines)
+        stream = f'BT /F1 11 Tf 14 TL 72 760 Td {text} ET'.encode('latin-1')
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        objects.append((content_id, b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream'))
+        objects.append((page_id, f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                                 f'/Resources << /Font << /F1 {font_id} 0 R >> >> '
+                                 f'/Contents {content_id} 0 R >>'.encode('latin-1')))
+        page_ids.append(page_id)
+    kids = ' '.join(f'{pid} 0 R' for pid in page_ids)
+    objects = [
+        (1, b'<< /Type /Catalog /Pages 2 0 R >>'),
+        (2, f'<< /Type /Pages /Kids [{kids}] /Count {pages} >>'.encode('latin-1')),
+        (font_id, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>'),
+    ] + objects
+
+    with open(path, 'wb') as f:
+        f.write(b'%PDF-1.4\n')
+        offsets = {}
+        for obj_id, body in objects:
+            offsets[obj_id] = f.tell()
+            f.write(b'%d 0 obj\n' % obj_id + body + b'\nendobj\n')
+        xref = f.tell()
+        f.write(b'xref\n0 %d\n0000000000 65535 f \n' % (next_id))
+        for obj_id in range(1, next_id):
+            f.write(b'%010d 00000 n \n' % offsets[obj_id])
+        f.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (next_id, xref))
+
+
+def bench_extract_pdf(config):
+    """Extract and parse a generated PDF with extract_pdf.py."""
+    try:
+        import extract_pdf
+    except ImportError as e:
+        return {'skipped': f'{e}'}
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = Path(tmp) / 'bench.pdf'
+        write_test_pdf(pdf_path, config['pages'])
+        start = time.perf_counter()
+        page_latencies = []
+        page_start = start
+
+        def timed_pages():
+            nonlocal page_start
+            for text in extract_pdf.iter_page_texts(str(pdf_path), config['workers']):
+                now = time.perf_counter()
+                page_latencies.append(now - page_start)
+                page_start = now
+                yield text
+
+        word_lists = extract_pdf.collect_word_lists(extract_pdf.iter_tagged_words(timed_pages()))
+        elapsed = time.perf_counter() - start
+        json_bytes = len(json.dumps(word_lists).encode('utf-8'))
+        words = sum(len(words) for words in word_lists.values())
+    return {
+        'pages': config['pages'],
+        'words': words,
+        'seconds': round(elapsed, 3),
+        'pages_per_second': round(config['pages'] / elapsed, 1),
+        'words_per_second': round(words / elapsed, 1),
+        **latency_summary(page_latencies),
+        'bytes_written': json_bytes,
+        **peak_rss(),
+    }
+
+
+SCENARIOS = {
+    'generate_main': bench_generate_main,
+    'generate_word': bench_generate_word,
+    'extract_pdf': bench_extract_pdf,
+}
+
+
+def run_isolated(name, config):
+    """Run one scenario in a fresh process so its peak RSS is its own."""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(SCENARIOS[name], config).result()
+
+
+def scenario_label(name, config):
+    params = ','.join(f'{key}={value}' for key, value in sorted(config.items())
+                      if key not in ('latency', 'jitter', 'error_rate'))
+    return f'{name}[{params}]'
+
+
+def compare(previous_path, results):
+    """Print words/second and p95 changes against an earlier result file."""
+    with open(previous_path, encoding='utf-8') as f:
+        previous = {r['label']: r for r in json.load(f)['results']}
+    print(f"\nCompared with {previous_path}:")
+    for result in results:
+        old = previous.get(result['label'])
+        if not old or 'words_per_second' not in old or 'words_per_second' not in result:
+            continue
+        speedup = result['words_per_second'] / old['words_per_second'] if old['words_per_second'] else 0
+        print(f"  {result['label']}: {old['words_per_second']} → {result['words_per_second']} words/s "
+              f"(x{speedup:.2f}), p95 {old['p95_ms']} → {result['p95_ms']} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark audio generation and PDF extraction offline')
+    parser.add_argument('--latency', type=float, default=0.05, help='Fake TTS latency in seconds (default: 0.05)')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Fake TTS jitter in seconds (default: 0.02)')
+    parser.add_argument('--error-rate', type=float, default=0.01,
+                        help='Fake TTS transient error rate (default: 0.01)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 32],
+                        help='Worker counts for generate_main (default: 1 8 32)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 40],
+                        help='SSML batch sizes for generate_main (default: 1 40)')
+    parser.add_argument('--word-calls', type=int, default=200,
+                        help='Words for the generate_audio_for_word scenario (default: 200)')
+    parser.add_argument('--pdf-pages', type=int, nargs='+', default=[10, 100, 500],
+                        help='Generated PDF sizes in pages (default: 10 100 500)')
+    parser.add_argument('--pdf-workers', type=int, nargs='+', default=[1, 4],
+                        help='Process counts for PDF extraction (default: 1 4)')
+    parser.add_argument('--only', choices=sorted(SCENARIOS), nargs='+', default=sorted(SCENARIOS),
+                        help='Run only these scenarios')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='Result file (default: benchmark-<timestamp>.json)')
+    parser.add_argument('--compare', type=Path, default=None,
+                        help='Earlier result file to compare against')
+    args = parser.parse_args(argv)
+
+    fake = {'latency': args.latency, 'jitter': args.jitter, 'error_rate': args.error_rate}
+    plan = []
+    if 'generate_main' in args.only:
+        plan += [('generate_main', {**fake, 'workers': w, 'batch_size': b})
+                 for b in args.batch_sizes for w in args.workers]
+    if 'generate_word' in args.only:
+        plan.append(('generate_word', {**fake, 'words': args.word_calls}))
+    if 'extract_pdf' in args.only:
+        plan += [('extract_pdf', {'pages': p, 'workers': w}) for p in args.pdf_pages for w in args.pdf_workers]
+
+    print(f"Running {len(plan)} benchmark scenario(s) "
+          f"(latency {args.latency * 1000:.0f}ms ± {args.jitter * 1000:.0f}ms, errors {args.error_rate:.1%})")
+    print("=" * 60)
+    results = []
+    for name, config in plan:
+        label = scenario_label(name, config)
+        result = {'label': label, 'scenario': name, 'config': config, **run_isolated(name, config)}
+        results.append(result)
+        if 'skipped' in result:
+            print(f"  - {label}: skipped ({result['skipped']})")
+            continue
+        print(f"  {label}: {result['words_per_second']} words/s, "
+              f"p50/p95/p99 {result['p50_ms']}/{result['p95_ms']}/{result['p99_ms']} ms, "
+              f"RSS {result['peak_rss_self_bytes'] / 1024 / 1024:.1f} MB "
+              f"(children {result['peak_rss_children_bytes'] / 1024 / 1024:.1f} MB), "
+              f"wrote {result['bytes_written'] / 1024:.0f} KB")
+
+    timestamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    output = args.output or Path(f'benchmark-{timestamp}.json')
+    report = {
+        'timestamp': timestamp,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'results': results,
+    }
+    output.write_text(json.dumps(report, indent=1), encoding='utf-8')
+    print(f"\nResults saved to {output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
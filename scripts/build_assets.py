@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Build the offline asset manifest, precompressed text assets and precache list.
+
+Writes, at the site root:
+- asset-manifest.json: content hash, size and mtime of the HTML, JS, CSS and
+  every file under audio/ (MP3s, plus bundles/indexes from build_bundle.py)
+- <asset>.gz and, if the optional `brotli` package is installed, <asset>.br
+  next to every text asset, for servers that serve precompressed files
+- precache-manifest.js: the list sw.js precaches on install (app shell) and
+  warms in the background per grade (audio), with content hashes as revisions
+
+The build is incremental: files whose size and mtime match the previous
+manifest are not re-hashed, and compressed copies are only rewritten when
+their source changed.
+
+Usage:
+    python build_assets.py [--root ..]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+from pathlib import Path
+
+from audio_cache import write_atomic
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST_NAME = 'asset-manifest.json'
+PRECACHE_NAME = 'precache-manifest.js'
+MANIFEST_VERSION = 1
+
+# The app shell: everything index.html needs to start (durations.json is written by scan_audio.py)
+SHELL_FILES = ['index.html', 'style.css', 'words.js', 'app.js', 'audio/durations.json']
+TEXT_SUFFIXES = {'.html', '.css', '.js', '.json'}
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """Short content hash of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def collect_assets(root):
+    """Relative paths of every asset the player can request."""
+    assets = [name for name in SHELL_FILES if (root / name).exists()]
+    audio_dir = root / 'audio'
+    if audio_dir.is_dir():
+        for path in sorted(audio_dir.rglob('*')):
+            # Audio plus build_bundle.py indexes; not the build's own manifest/state files
+            if path.is_file() and (path.suffix == '.mp3' or path.name.endswith('.index.json')):
+                assets.append(path.relative_to(root).as_posix())
+    return assets
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return manifest.get('files', {}) if manifest.get('version') == MANIFEST_VERSION else {}
+
+
+def precompress(path, force=False):
+    """Write .gz (and .br) copies of a text asset that are missing or older than it;
+    returns the variants written."""
+    data = None
+    mtime_ns = path.stat().st_mtime_ns
+    written = []
+    variants = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli:
+        variants.append(('.br', lambda d: brotli.compress(d, quality=11)))
+    for suffix, compress in variants:
+        target = path.with_name(path.name + suffix)
+        if not force and target.exists() and target.stat().st_mtime_ns >= mtime_ns:
+            continue
+        if data is None:
+            data = path.read_bytes()
+        write_atomic(target, compress(data))
+        written.append(target.name)
+    return written
+
+
+def render_precache(files):
+    """precache-manifest.js: app shell entries plus audio entries grouped by grade."""
+    shell = [{'url': name, 'revision': files[name]['hash']} for name in SHELL_FILES if name in files]
+    audio = {}
+    for name, entry in files.items():
+        parts = name.split('/')
+        if parts[0] != 'audio' or name in SHELL_FILES:
+            continue
+        # audio/<grade>/<word>.mp3, or audio/<grade>.bundle.mp3 / audio/<grade>.index.json
+        grade = parts[1] if len(parts) > 2 else parts[1].split('.')[0]
+        audio.setdefault(grade, []).append({'url': name, 'revision': entry['hash']})
+    hashes = sorted((name, entry['hash']) for name, entry in files.items())
+    version = hashlib.sha256(json.dumps(hashes).encode('utf-8')).hexdigest()[:12]
+    payload = json.dumps({'version': version, 'shell': shell, 'audio': audio}, separators=(',', ':'))
+    return ('// Generated by scripts/build_assets.py - do not edit\n'
+            f'self.PRECACHE_MANIFEST = {payload};\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build asset manifest, precompressed assets and precache list')
+    parser.add_argument('--root', type=Path, default=Path(__file__).resolve().parent.parent,
+                        help='Site root containing index.html and audio/ (default: ..)')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-hash and recompress everything')
+    args = parser.parse_args(argv)
+
+    root = args.root
+    manifest_path = root / MANIFEST_NAME
+    previous = {} if args.force else load_manifest(manifest_path)
+
+    files = {}
+    hashed = 0
+    compressed = 0
+    for name in collect_assets(root):
+        path = root / name
+        stat = path.stat()
+        entry = previous.get(name)
+        if not entry or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            entry = {'hash': hash_file(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            hashed += 1
+        files[name] = entry
+        if path.suffix in TEXT_SUFFIXES:
+            compressed += len(precompress(path, force=args.force))
+
+    write_atomic(manifest_path, json.dumps({'version': MANIFEST_VERSION, 'files': files},
+                                           indent=1, sort_keys=True).encode('utf-8'))
+    write_atomic(root / PRECACHE_NAME, render_precache(files).encode('utf-8'))
+    precompress(root / PRECACHE_NAME, force=True)
+
+    audio_files = sum(1 for name in files if name.endswith('.mp3'))
+    total_mb = sum(entry['size'] for entry in files.values()) / (1024 * 1024)
+    print(f"✅ {len(files)} assets ({audio_files} audio, {total_mb:.2f} MB): "
+          f"{hashed} re-hashed, {compressed} compressed copies written")
+    if not brotli:
+        print("   (install `brotli` to also write .br files)")
+    print(f"   {manifest_path.name}, {PRECACHE_NAME}")
+
+
+if __name__ == '__main__':
+    main()
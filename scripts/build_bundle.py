@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Pack each grade's MP3s into a single bundle file with an offset index.
+
+The player otherwise fetches audio/<grade>/<word>.mp3 one request at a time.
+This build stage concatenates every MP3 of a grade into audio/<grade>.bundle.mp3
+and writes audio/<grade>.index.json mapping each word's file name to its
+byte offset, length and duration, so the player can download one file and
+play any word from a slice of it.
+
+Each file is memory-mapped and copied straight into the bundle, so memory use
+stays flat however many files there are. Bundles whose inputs are unchanged
+(same names, sizes and modification times) are not rebuilt.
+
+Usage:
+    python build_bundle.py [--audio-dir ../audio] [--grade-level gr23|gr45|both] [--force]
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+from pathlib import Path
+
+from audio_cache import atomic_output, write_atomic
+from mp3_frames import mp3_duration
+
+INDEX_VERSION = 1
+
+
+def bundle_paths(audio_dir, grade):
+    """Return (bundle path, index path) for a grade."""
+    return audio_dir / f'{grade}.bundle.mp3', audio_dir / f'{grade}.index.json'
+
+
+def source_digest(files):
+    """Fingerprint a set of input files by name, size and modification time."""
+    digest = hashlib.sha256()
+    for path in files:
+        stat = path.stat()
+        digest.update(f'{path.name}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_index(index_path):
+    """Load a bundle index, or return None if it is missing or unreadable."""
+    try:
+        with open(index_path, encoding='utf-8') as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return index if index.get('version') == INDEX_VERSION else None
+
+
+def build_bundle(grade_dir, bundle_path, index_path, force=False):
+    """Build one grade's bundle and index; return the index (or None if up to date)."""
+    files = sorted(grade_dir.glob('*.mp3'))
+    digest = source_digest(files)
+    existing = load_index(index_path)
+    if not force and existing and existing.get('source') == digest and bundle_path.exists():
+        return None
+
+    words = {}
+    offset = 0
+    with atomic_output(bundle_path) as out:
+        for path in files:
+            with open(path, 'rb') as f:
+                size = path.stat().st_size
+                if size == 0:
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    duration = mp3_duration(data)
+                    out.write(data)
+            words[path.stem] = [offset, size, round(duration * 1000)]
+            offset += size
+
+    index = {
+        'version': INDEX_VERSION,
+        'bundle': bundle_path.name,
+        'size': offset,
+        'source': digest,
+        # file name stem -> [byte offset, byte length, duration in ms]
+        'words': words,
+    }
+    write_atomic(index_path, json.dumps(index, separators=(',', ':')).encode('utf-8'))
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pack per-word MP3s into one bundle per grade')
+    parser.add_argument('--audio-dir', type=Path, default=Path(__file__).resolve().parent.parent / 'audio',
+                        help='Directory containing the <grade>/ folders (default: ../audio)')
+    parser.add_argument('--grade-level', choices=['gr23', 'gr45', 'both'], default='both',
+                        help='Which grade level to bundle (default: both)')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild bundles even if their inputs are unchanged')
+    args = parser.parse_args(argv)
+
+    grades = ['gr23', 'gr45'] if args.grade_level == 'both' else [args.grade_level]
+
+    print(f"Bundling audio in {args.audio_dir}")
+    print("=" * 60)
+    for grade in grades:
+        grade_dir = args.audio_dir / grade
+        if not grade_dir.is_dir():
+            print(f"  ❌ {grade_dir} does not exist, skipping")
+            continue
+        bundle_path, index_path = bundle_paths(args.audio_dir, grade)
+        index = build_bundle(grade_dir, bundle_path, index_path, force=args.force)
+        if index is None:
+            print(f"  ✓ {grade.upper()}: up to date ({bundle_path.name})")
+            continue
+        size_mb = index['size'] / (1024 * 1024)
+        total_seconds = sum(entry[2] for entry in index['words'].values()) / 1000
+        print(f"  📦 {grade.upper()}: {len(index['words'])} files → {bundle_path.name} "
+              f"({size_mb:.2f} MB, {total_seconds:.0f}s of audio), index {index_path.name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,207 @@
+#!/usr/bin/env python3
+"""
+Extract spelling words from PSIA PDF word lists.
+
+Pages are extracted one at a time (optionally spread across a process pool
+with --workers), so large multi-year/multi-division packets are never held
+in memory as one string. With no output options the raw text is printed, as
+before. --json parses the text into deduplicated, grade-tagged word lists:
+
+    {"gr23": ["abduction", ...], "gr45": ["abdomen", ...]}
+
+which generate_audio.py loads with --words-json, and --words-js renders the
+same lists as words.js for the web app.
+
+The grade comes from "Grades 2-3"-style headings in the text, falling back to
+a gr23/gr45 tag in the file name (or --grade).
+
+Usage:
+    python extract_pdf.py spelling-2026-gr45-list.pdf
+    python extract_pdf.py *.pdf --json words.json --words-js ../words.js [--workers 4]
+"""
+
+import argparse
+import json
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
 import PyPDF2
 
-pdf_path = sys.argv[1]
-with open(pdf_path, 'rb') as file:
-    pdf_reader = PyPDF2.PdfReader(file)
-    text = ''
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-print(text)
+# Pages per task when extracting with a process pool
+PAGES_PER_TASK = 8
+
+GRADE_HEADING = re.compile(r'\bgrades?\s*(\d)\s*(?:-|–|&|and|to)\s*(\d)\b', re.IGNORECASE)
+GRADE_IN_NAME = re.compile(r'gr(\d\d)', re.IGNORECASE)
+# Page headers and footers that are not part of any list ("PSIA Spelling 2025-2026", "Page 3 of 8")
+HEADER = re.compile(r'^\s*(psia\b|page\s+\d+\b)', re.IGNORECASE)
+# Unnumbered multi-word phrases containing these are titles ("Elementary Division", "Word List"), not entries
+TITLE_WORD = re.compile(r'\b(psia|spelling|page|division|list|words?)\b', re.IGNORECASE)
+# "12." / "12)" list numbering, used to split lines holding several entries
+NUMBERING = re.compile(r'(?:^|\s)\d+\s*[.)]\s*')
+COLUMN_GAP = re.compile(r'\s{2,}|\t')
+# A spelling entry: letters with optional inner spaces, hyphens or apostrophes ("yard sale", "do-it-yourself")
+WORD = re.compile(r"^[A-Za-z](?:[A-Za-z'\- ]*[A-Za-z])?$")
+MAX_WORDS_PER_ENTRY = 4
+
+
+def page_count(pdf_path):
+    with open(pdf_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def extract_page_range(pdf_path, start, stop):
+    """Return the text of pages [start, stop) as a list (runs in worker processes)."""
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [pdf_reader.pages[i].extract_text() or '' for i in range(start, stop)]
+
+
+def iter_page_texts(pdf_path, workers=1):
+    """Yield the text of each page in order, one page at a time."""
+    if workers <= 1:
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            for page in pdf_reader.pages:
+                yield page.extract_text() or ''
+        return
+
+    # Each worker opens the PDF itself; readers cannot be shared between processes
+    total = page_count(pdf_path)
+    ranges = [(start, min(start + PAGES_PER_TASK, total)) for start in range(0, total, PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = pool.map(extract_page_range, [pdf_path] * len(ranges),
+                          [start for start, _ in ranges], [stop for _, stop in ranges])
+        for chunk in chunks:
+            yield from chunk
+
+
+def grade_from_name(pdf_path):
+    """Return the grade tag ("gr23") found in a file name, or None."""
+    match = GRADE_IN_NAME.search(Path(pdf_path).name)
+    return f"gr{match.group(1)}" if match else None
+
+
+def parse_entries(line):
+    """Return the spelling entries on one line of extracted text.
+
+    Numbered lines ("1. atom 2. yard sale") are split at the numbers; other
+    lines are split into columns at runs of two or more spaces or tabs, and
+    multi-word title phrases among them are dropped. Single words are always
+    kept, since list words such as "division" can look like header words.
+    Multi-word entries are only taken from numbered lines: elsewhere a single
+    space is as likely to separate words as to join them, so an unnumbered
+    "abduction abnormal accountant" is split into words, with a warning.
+    """
+    numbered = bool(NUMBERING.search(line))
+    candidates = NUMBERING.split(line) if numbered else COLUMN_GAP.split(line)
+
+    entries = []
+    for candidate in candidates:
+        candidate = ' '.join(candidate.split())
+        words = len(candidate.split())
+        if not WORD.match(candidate):
+            continue
+        if not numbered and words > 1:
+            if TITLE_WORD.search(candidate):
+                continue
+            print(f"⚠️  Split unnumbered entry {candidate!r} into single words", file=sys.stderr)
+            entries.extend(word for word in candidate.split() if WORD.match(word))
+            continue
+        if words <= MAX_WORDS_PER_ENTRY:
+            entries.append(candidate)
+    return entries
+
+
+def iter_tagged_words(page_texts, default_grade=None):
+    """Yield (grade, word) pairs from page texts, following grade headings."""
+    grade = default_grade
+    for text in page_texts:
+        for line in text.splitlines():
+            heading = GRADE_HEADING.search(line)
+            if heading:
+                grade = f"gr{heading.group(1)}{heading.group(2)}"
+                continue
+            if grade is None or HEADER.search(line):
+                continue
+            for word in parse_entries(line):
+                yield grade, word
+
+
+def collect_word_lists(tagged_words):
+    """Group (grade, word) pairs into per-grade lists, deduplicated case-insensitively in first-seen order."""
+    word_lists = {}
+    seen = {}
+    for grade, word in tagged_words:
+        key = word.lower()
+        grade_seen = seen.setdefault(grade, set())
+        if key in grade_seen:
+            continue
+        grade_seen.add(key)
+        word_lists.setdefault(grade, []).append(word)
+    return word_lists
+
+
+def render_words_js(word_lists, per_line=10):
+    """Render word lists in the words.js layout used by the web app."""
+    lines = ["// PSIA Spelling Lists (generated by scripts/extract_pdf.py)", ""]
+    for grade in sorted(word_lists):
+        words = word_lists[grade]
+        label = f"Grades {grade[2]}-{grade[3]}" if len(grade) == 4 else grade
+        lines.append(f"// {label} ({len(words)} words)")
+        lines.append(f"const SPELLING_WORDS_{grade.upper()} = [")
+        rows = [words[i:i + per_line] for i in range(0, len(words), per_line)]
+        for i, row in enumerate(rows):
+            suffix = ',' if i < len(rows) - 1 else ''
+            lines.append('    ' + ', '.join(json.dumps(word) for word in row) + suffix)
+        lines.append("];")
+        lines.append("")
+    default = max(word_lists) if word_lists else None
+    lines.append("// Default word list (can be changed by user)")
+    lines.append(f"let SPELLING_WORDS = SPELLING_WORDS_{default.upper()};" if default else "let SPELLING_WORDS = [];")
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Extract spelling words from PSIA PDF lists')
+    parser.add_argument('pdfs', nargs='+', help='PDF files to read')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes used to extract pages (default: 1)')
+    parser.add_argument('--grade', default=None,
+                        help='Grade tag for words before any grade heading (default: from file name)')
+    parser.add_argument('--json', type=Path, dest='json_path',
+                        help='Write grade-tagged word lists to this JSON file')
+    parser.add_argument('--words-js', type=Path,
+                        help='Also render the word lists as a words.js file')
+    args = parser.parse_args(argv)
+
+    if not args.json_path and not args.words_js:
+        # Raw text mode: stream pages straight to stdout
+        for pdf_path in args.pdfs:
+            for text in iter_page_texts(pdf_path, args.workers):
+                sys.stdout.write(text)
+        print()
+        return
+
+    def tagged_words():
+        for pdf_path in args.pdfs:
+            default_grade = args.grade or grade_from_name(pdf_path)
+            yield from iter_tagged_words(iter_page_texts(pdf_path, args.workers), default_grade)
+
+    word_lists = collect_word_lists(tagged_words())
+    for grade in sorted(word_lists):
+        print(f"  {grade}: {len(word_lists[grade])} words", file=sys.stderr)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(word_lists, f, indent=1)
+            f.write('\n')
+        print(f"✅ Wrote {args.json_path}", file=sys.stderr)
+    if args.words_js:
+        args.words_js.write_text(render_words_js(word_lists), encoding='utf-8')
+        print(f"✅ Wrote {args.words_js}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,16 +15,47 @@ Prerequisites:
 
 Usage:
     python generate_audio.py [--voice-type male|female] [--grade-level gr23|gr45|both]
+                             [--workers N] [--rpm N] [--cpm N] [--max-retries N]
+
+Use --workers to keep several requests in flight at once. --rpm and --cpm cap
+requests and characters per minute to stay inside the API quota, and transient
+errors are retried with exponential backoff. Pass --backend fake to run the
+whole pipeline offline against a local stand-in with injected latency/errors.
+
+Generated files are tracked in <output-dir>/manifest.json (see audio_cache.py);
+only missing or stale files are synthesized, so re-runs and interrupted runs
+are incremental. Pass --force to rebuild everything.
+
+--voices NAME [NAME ...] generates several voices in one run with a shared
+client and scheduler, under <output-dir>/<voice>/<grade>/. Each unique
+(normalized text, voice) pair is synthesized once; the same word in another
+list is hard-linked instead of being billed again.
+
+--metrics-json / --metrics-prom export request latency histograms, retries and
+failures by error class, billed characters per voice tier, bytes written per
+grade and timing spans (see metrics.py). --failures writes the words that
+could not be generated; feed that file back with --retry-failures.
+
+--batch-size N packs N words into one SSML request and splits the result at
+<mark> timepoints (see ssml_batch.py); words whose split fails are retried
+with single-word requests.
 """
 
 import os
 import sys
 import argparse
+import json
 import re
 from pathlib import Path
-from google.cloud import texttospeech
 
-# Word lists (copied from words.js)
+from audio_cache import (MANIFEST_NAME, BuildManifest, cache_key, link_atomic,
+                         remove_stale_temp_files, write_atomic)
+from metrics import Metrics, NullMetrics, voice_tier
+from ssml_batch import build_ssml, split_by_marks
+from synthesis_engine import RateLimiter, SynthesisEngine
+from tts_backends import LANGUAGE_CODE, SPEAKING_RATE, FakeTTSBackend, GoogleTTSBackend
+
+# Word lists (copied from words.js); use --words-json to load lists from extract_pdf.py instead
 SPELLING_WORDS_GR23 = [
     "abduction", "abnormal", "accountant", "accurate", "actress", "adjust", "admire", "adverb", "agreement", "airport",
     "allowance", "almost", "altar", "animated", "ankle", "answer", "antonym", "anxious", "apparel", "applaud",
@@ -172,6 +203,17 @@ SPELLING_WORDS_GR45 = [
 ]
 
 
+def load_word_lists(path):
+    """Load {"gr23": [...], "gr45": [...]} word lists written by extract_pdf.py --json."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def normalize_text(word):
+    """Text as the TTS engine hears it: case and spacing differences are ignored."""
+    return ' '.join(word.lower().split())
+
+
 def sanitize_filename(word):
     """Convert word to safe filename (lowercase, replace spaces with underscores)."""
     # Convert to lowercase
@@ -183,36 +225,38 @@ def sanitize_filename(word):
     return filename
 
 
-def generate_audio_for_word(client, word, voice_name, output_path):
-    """Generate audio for a single word using Google Cloud TTS."""
-    # Set up the synthesis input
-    synthesis_input = texttospeech.SynthesisInput(text=word)
+def generate_audio_for_word(client, word, voice_name, output_path, metrics=None):
+    """Generate audio for a single word using a TTS backend (see tts_backends.py)."""
+    metrics = metrics or NullMetrics()
+    audio_content = client.synthesize(word, voice_name)
 
-    # Set up the voice parameters
-    voice = texttospeech.VoiceSelectionParams(
-        language_code="en-US",
-        name=voice_name
-    )
+    # Write the response to an MP3 file (atomically, so no half-written files)
+    with metrics.span('file_write'):
+        write_atomic(output_path, audio_content)
+    return len(audio_content)
 
-    # Set up the audio config
-    audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.MP3,
-        speaking_rate=0.9  # Slightly slower for clarity
-    )
 
-    # Perform the text-to-speech request
-    response = client.synthesize_speech(
-        input=synthesis_input,
-        voice=voice,
-        audio_config=audio_config
-    )
+def generate_audio_for_batch(client, words, voice_name, output_paths, metrics=None):
+    """Generate audio for several words with one SSML request.
 
-    # Write the response to an MP3 file
-    with open(output_path, 'wb') as out:
-        out.write(response.audio_content)
+    Returns the size written for each word, or None for words that could not
+    be split out of the batch and need a single-word request.
+    """
+    metrics = metrics or NullMetrics()
+    audio_content, timepoints = client.synthesize_marked(build_ssml(words), voice_name)
+    sizes = []
+    for clip, output_path in zip(split_by_marks(audio_content, timepoints, len(words)), output_paths):
+        if clip is None:
+            sizes.append(None)
+            continue
+        with metrics.span('file_write'):
+            write_atomic(output_path, clip)
+        sizes.append(len(clip))
+    return sizes
 
 
-def main():
+def main(argv=None, backend=None):
+    """Run the generator; `backend` overrides --backend (used by benchmark.py)."""
     parser = argparse.ArgumentParser(description='Generate audio files for spelling words')
     parser.add_argument('--voice-type', choices=['male', 'female'], default='female',
                         help='Voice gender (default: female)')
@@ -220,20 +264,62 @@ def main():
                         help='Which grade level to generate (default: both)')
     parser.add_argument('--use-wavenet', action='store_true',
                         help='Use WaveNet voices (higher quality, costs ~$0.20 total)')
-
-    args = parser.parse_args()
-
-    # Determine voice name
-    if args.use_wavenet:
-        voice_name = 'en-US-Wavenet-C' if args.voice_type == 'female' else 'en-US-Wavenet-D'
-        print(f"Using WaveNet voice: {voice_name} (premium quality)")
+    parser.add_argument('--voices', nargs='+', default=None, metavar='VOICE',
+                        help='Matrix mode: generate every listed voice (e.g. en-US-Standard-C '
+                             'en-US-Wavenet-D) in one run, into <output-dir>/<voice>/<grade>/')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of synthesis requests kept in flight (default: 1)')
+    parser.add_argument('--rpm', type=int, default=None,
+                        help='Maximum requests per minute (default: unlimited)')
+    parser.add_argument('--cpm', type=int, default=None,
+                        help='Maximum characters per minute (default: unlimited)')
+    parser.add_argument('--max-retries', type=int, default=3,
+                        help='Retries per word for transient errors (default: 3)')
+    parser.add_argument('--backend', choices=['google', 'fake'], default='google',
+                        help='TTS backend; "fake" runs offline with silent audio (default: google)')
+    parser.add_argument('--fake-latency', type=float, default=0.05,
+                        help='Fake backend: seconds per request (default: 0.05)')
+    parser.add_argument('--fake-error-rate', type=float, default=0.0,
+                        help='Fake backend: probability of a transient error (default: 0)')
+    parser.add_argument('--output-dir', type=Path, default=Path(__file__).resolve().parent.parent / 'audio',
+                        help='Directory that receives the <grade>/ folders (default: ../audio)')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='Words per SSML request; 1 sends one request per word (default: 1)')
+    parser.add_argument('--fake-drop-mark-rate', type=float, default=0.0,
+                        help='Fake backend: probability a batch timepoint is missing (default: 0)')
+    parser.add_argument('--words-json', type=Path, default=None,
+                        help='Load word lists from a JSON file written by extract_pdf.py --json')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-synthesize every word, ignoring the build manifest')
+    parser.add_argument('--metrics-json', type=Path, default=None,
+                        help='Write a JSON metrics report (latencies, retries, failures, bytes) here')
+    parser.add_argument('--metrics-prom', type=Path, default=None,
+                        help='Write metrics in Prometheus textfile format here')
+    parser.add_argument('--failures', type=Path, default=None,
+                        help='Write the list of words that failed to this JSON file')
+    parser.add_argument('--retry-failures', type=Path, default=None,
+                        help='Only generate the words listed in a --failures file')
+
+    args = parser.parse_args(argv)
+
+    # Determine voice name(s)
+    if args.voices:
+        voices = args.voices
+        print(f"Voice matrix: {', '.join(voices)}")
+    elif args.use_wavenet:
+        voices = ['en-US-Wavenet-C' if args.voice_type == 'female' else 'en-US-Wavenet-D']
+        print(f"Using WaveNet voice: {voices[0]} (premium quality)")
     else:
-        voice_name = 'en-US-Standard-C' if args.voice_type == 'female' else 'en-US-Standard-D'
-        print(f"Using Standard voice: {voice_name} (free tier)")
+        voices = ['en-US-Standard-C' if args.voice_type == 'female' else 'en-US-Standard-D']
+        print(f"Using Standard voice: {voices[0]} (free tier)")
 
-    # Initialize the Text-to-Speech client
+    # Initialize the Text-to-Speech client (one client is shared by every voice and worker)
     try:
-        client = texttospeech.TextToSpeechClient()
+        if backend is None and args.backend == 'fake':
+            backend = FakeTTSBackend(latency=args.fake_latency, error_rate=args.fake_error_rate,
+                                     drop_mark_rate=args.fake_drop_mark_rate)
+        elif backend is None:
+            backend = GoogleTTSBackend(timepoints=args.batch_size > 1)
     except Exception as e:
         print("\n❌ Error: Could not initialize Google Cloud TTS client.")
         print("Make sure you have:")
@@ -246,67 +332,180 @@ def main():
         print(f"\nError details: {e}")
         sys.exit(1)
 
+    limiter = RateLimiter(requests_per_minute=args.rpm, chars_per_minute=args.cpm)
+    metrics = Metrics()
+    engine = SynthesisEngine(backend, workers=args.workers, limiter=limiter,
+                             max_retries=args.max_retries, metrics=metrics)
+
     # Create output directories
-    base_dir = Path(__file__).parent / 'audio'
-    base_dir.mkdir(exist_ok=True)
+    base_dir = args.output_dir
+    base_dir.mkdir(parents=True, exist_ok=True)
+    removed = remove_stale_temp_files(base_dir)
+    if removed:
+        print(f"Removed {removed} partial file(s) from an interrupted run")
+    manifest = BuildManifest(base_dir / MANIFEST_NAME)
 
     # Determine which grade levels to process
-    grade_levels = []
-    if args.grade_level in ['gr23', 'both']:
-        grade_levels.append(('gr23', SPELLING_WORDS_GR23))
-    if args.grade_level in ['gr45', 'both']:
-        grade_levels.append(('gr45', SPELLING_WORDS_GR45))
-
-    # Process each grade level
-    total_words = sum(len(words) for _, words in grade_levels)
+    if args.words_json:
+        word_lists = load_word_lists(args.words_json)
+    else:
+        word_lists = {'gr23': SPELLING_WORDS_GR23, 'gr45': SPELLING_WORDS_GR45}
+    grade_levels = [(grade, words) for grade, words in sorted(word_lists.items())
+                    if args.grade_level in [grade, 'both']]
+    if args.retry_failures:
+        with open(args.retry_failures, encoding='utf-8') as f:
+            retry = {(failure['grade'], failure['word']) for failure in json.load(f)}
+        grade_levels = [(grade, [word for word in words if (grade, word) in retry])
+                        for grade, words in grade_levels]
+
+    # Collect every output file under its unique (voice, normalized text) pair, so a
+    # word that appears in several lists is synthesized once and linked into the rest
+    groups = {}
+    output_dirs = []
+    for voice_name in voices:
+        # Matrix runs use <output-dir>/<voice>/<grade>/; single-voice runs keep <output-dir>/<grade>/
+        voice_dir = base_dir / voice_name if args.voices else base_dir
+        for grade, words in grade_levels:
+            grade_dir = voice_dir / grade
+            grade_dir.mkdir(parents=True, exist_ok=True)
+            output_dirs.append(grade_dir)
+            for word in words:
+                job = groups.setdefault((voice_name, normalize_text(word)), {
+                    'word': word,
+                    'voice': voice_name,
+                    'key': cache_key(word, voice_name, LANGUAGE_CODE, SPEAKING_RATE, 'MP3'),
+                    'targets': [],
+                })
+                job['targets'].append(grade_dir / (sanitize_filename(word) + '.mp3'))
+
+    # Skip files the manifest says are up to date; reuse a fresh copy where one exists
+    jobs = []
+    up_to_date = 0
+    linked = 0
+    with metrics.span('scan', phase='manifest'):
+        for job in groups.values():
+            fresh = [] if args.force else [p for p in job['targets'] if manifest.is_fresh(job['key'], p)]
+            stale = [p for p in job['targets'] if p not in fresh]
+            up_to_date += len(fresh)
+            if not stale:
+                continue
+            if fresh:
+                for output_path in stale:
+                    link_atomic(fresh[0], output_path)
+                    manifest.record(job['key'], output_path, job['word'], job['voice'], fresh[0].stat().st_size)
+                linked += len(stale)
+                continue
+            jobs.append((job['word'], job['voice'], job['key'], stale))
+    manifest.save()
+
+    total_files = sum(len(words) for _, words in grade_levels) * len(voices)
+    total_words = len(jobs)
     processed = 0
+    print(f"📚 {total_files} files: {total_words} to synthesize, {linked} reused, {up_to_date} up to date")
 
-    print(f"\nGenerating audio for {total_words} words...")
+    print(f"\nGenerating audio for {total_words} words ({engine.workers} worker(s))...")
     print("=" * 60)
 
-    for grade, words in grade_levels:
-        grade_dir = base_dir / grade
-        grade_dir.mkdir(exist_ok=True)
-
-        print(f"\n📚 Processing {grade.upper()} ({len(words)} words)")
-        print("-" * 60)
-
-        for i, word in enumerate(words, 1):
-            filename = sanitize_filename(word) + '.mp3'
-            output_path = grade_dir / filename
+    # Group jobs into SSML batches of one voice each (a batch of one is a plain single-word request)
+    batch_size = max(1, args.batch_size)
+    batches = []
+    for voice_name in voices:
+        voice_jobs = [job for job in jobs if job[1] == voice_name]
+        batches += [voice_jobs[i:i + batch_size] for i in range(0, len(voice_jobs), batch_size)]
+    fallbacks = 0
+
+    def synthesize_batch(batch):
+        voice_name = batch[0][1]
+        sizes = [None] * len(batch)
+        if len(batch) > 1:
+            try:
+                sizes = generate_audio_for_batch(engine, [job[0] for job in batch], voice_name,
+                                                 [job[3][0] for job in batch], metrics)
+            except Exception as e:
+                print(f"  ⚠️  Batch starting at '{batch[0][0]}' failed, retrying word by word: {e}")
 
+        results = []
+        for (word, _, key, targets), size in zip(batch, sizes):
+            # Words a batch could not provide are counted as fallbacks by the caller
+            fallback = size is None and len(batch) > 1
             try:
-                generate_audio_for_word(client, word, voice_name, output_path)
+                if size is None:
+                    size = generate_audio_for_word(engine, word, voice_name, targets[0], metrics)
+                # Same text and voice in other lists: hard-link instead of synthesizing again
+                for output_path in targets[1:]:
+                    link_atomic(targets[0], output_path)
+                for output_path in targets:
+                    manifest.record(key, output_path, word, voice_name, size)
+                results.append((word, voice_name, targets, size, fallback, None))
+            except Exception as e:
+                results.append((word, voice_name, targets, None, fallback, e))
+        return results
+
+    failed = []
+    try:
+        for _, results, _ in engine.run(batches, synthesize_batch):
+            for word, voice_name, targets, size, fallback, error in results:
+                fallbacks += fallback
+                if error is not None:
+                    failed.append(word)
+                    metrics.record_failure(word, error, grades=[output_path.parent.name for output_path in targets],
+                                           voice=voice_name)
+                    print(f"  ❌ Error generating '{word}' ({voice_name}): {error}")
+                    continue
                 processed += 1
+                for output_path in targets:
+                    grade = output_path.parent.name
+                    metrics.inc('audio_files_written_total', grade=grade)
+                    metrics.inc('audio_bytes_written_total', size, grade=grade)
+                manifest.save(every=25)
 
                 # Progress indicator
-                if i % 10 == 0 or i == len(words):
+                if processed % 10 == 0 or processed == total_words:
                     progress = (processed / total_words) * 100
-                    print(f"  [{processed}/{total_words}] {progress:.1f}% - {word} → {filename}")
-
-            except Exception as e:
-                print(f"  ❌ Error generating '{word}': {e}")
+                    print(f"  [{processed}/{total_words}] {progress:.1f}% - {word} → {targets[0].name}")
+    finally:
+        # Persist progress even on Ctrl-C so the next run resumes here
+        manifest.save()
 
     print("\n" + "=" * 60)
-    print(f"✅ Complete! Generated {processed}/{total_words} audio files")
+    print(f"✅ Complete! Generated {processed}/{total_words} audio files "
+          f"({linked} reused, {up_to_date} already up to date)")
+    if fallbacks:
+        print(f"Fell back to single-word requests for {fallbacks} word(s)")
+    if engine.retries:
+        print(f"Retried {engine.retries} transient error(s)")
+    if failed:
+        print(f"❌ {len(failed)} word(s) failed: {', '.join(failed)}")
     print(f"\nFiles saved in:")
-    for grade, _ in grade_levels:
-        grade_dir = base_dir / grade
-        print(f"  - {grade_dir}/")
+    for output_dir in output_dirs:
+        print(f"  - {output_dir}/")
 
     # Calculate total size
-    total_size = sum(f.stat().st_size for f in base_dir.rglob('*.mp3'))
+    with metrics.span('scan', phase='size'):
+        total_size = sum(f.stat().st_size for f in base_dir.rglob('*.mp3'))
     size_mb = total_size / (1024 * 1024)
     print(f"\nTotal size: {size_mb:.2f} MB")
 
-    # Calculate cost estimate
-    total_chars = sum(len(word) for _, words in grade_levels for word in words)
-    if args.use_wavenet:
-        cost = (total_chars / 1_000_000) * 16
-        print(f"Estimated cost: ${cost:.2f} (WaveNet pricing)")
+    # Calculate cost estimate (only what was actually sent this run)
+    total_chars = sum(len(word) for word, _, _, _ in jobs)
+    premium_chars = sum(len(word) for word, voice_name, _, _ in jobs if voice_tier(voice_name) != 'standard')
+    if premium_chars:
+        cost = (premium_chars / 1_000_000) * 16
+        print(f"Estimated cost: ${cost:.2f} (WaveNet pricing for {premium_chars:,} of {total_chars:,} characters)")
     else:
         print(f"Cost: FREE (within {total_chars:,} character free tier)")
 
+    # Export metrics for monitoring, and the failure list for --retry-failures
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+        print(f"Metrics report: {args.metrics_json}")
+    if args.metrics_prom:
+        metrics.write_prometheus(args.metrics_prom)
+        print(f"Prometheus metrics: {args.metrics_prom}")
+    if args.failures:
+        metrics.write_failures(args.failures)
+        print(f"Failure list ({len(failed)} word(s)): {args.failures}")
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Run metrics for generate_audio.py.
+
+Metrics collects labelled counters, latency histograms, timing spans and a
+structured failure list while a generation run is in progress, and exports
+them as a JSON report or a Prometheus textfile (for node_exporter's textfile
+collector) so nightly regeneration jobs can alert on slowdowns or quota burn.
+
+NullMetrics has the same interface and records nothing.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from audio_cache import write_atomic
+
+# Histogram buckets in seconds, suited to TTS round-trips and small file writes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_HELP = {
+    'tts_request_seconds': ('histogram', 'Latency of individual TTS requests, including failed attempts.'),
+    'tts_requests_total': ('counter', 'TTS requests sent, by outcome.'),
+    'tts_retries_total': ('counter', 'Transient TTS errors that were retried, by error class.'),
+    'tts_failures_total': ('counter', 'Words that could not be generated, by error class.'),
+    'tts_characters_total': ('counter', 'Characters sent to the TTS API (billable), by voice and tier.'),
+    'audio_bytes_written_total': ('counter', 'Audio bytes written, by grade.'),
+    'audio_files_written_total': ('counter', 'Audio files written, by grade.'),
+    'span_seconds': ('histogram', 'Time spent in instrumented sections (synthesis, file_write, scan).'),
+}
+
+
+def voice_tier(voice_name):
+    """Pricing tier from a voice name: en-US-Wavenet-C -> wavenet."""
+    parts = voice_name.split('-')
+    return parts[2].lower() if len(parts) >= 4 else 'unknown'
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values` (0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(latencies):
+    """Request count and p50/p95/p99 in milliseconds of latencies given in seconds."""
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Metrics:
+    """Thread-safe collector for one generation run."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self.failures = []
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the enclosed block into span_seconds{span=name}."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('span_seconds', time.perf_counter() - start, span=name, **labels)
+
+    def record_failure(self, word, error, grades=(None,), **context):
+        """Add a word that could not be generated to the failure list.
+
+        The failure is counted once; the list gets one entry per grade the word
+        was meant for (a word shared by several lists is synthesized once).
+        """
+        self.inc('tts_failures_total', error=type(error).__name__)
+        with self._lock:
+            for grade in grades:
+                entry = {'word': word, 'error': type(error).__name__, 'message': str(error), **context}
+                if grade is not None:
+                    entry['grade'] = grade
+                self.failures.append(entry)
+
+    def to_json(self):
+        """Return the collected metrics as a JSON-serializable dict."""
+        with self._lock:
+            counters = {
+                name: [{'labels': dict(key), 'value': value} for key, value in sorted(series.items())]
+                for name, series in sorted(self.counters.items())
+            }
+            histograms = {}
+            for name, series in sorted(self.histograms.items()):
+                histograms[name] = [{
+                    'labels': dict(key),
+                    'count': h.count,
+                    'sum': round(h.sum, 6),
+                    'buckets': {str(bound): count for bound, count in h.cumulative()},
+                } for key, h in sorted(series.items())]
+            failures = list(self.failures)
+        return {
+            'started': self.started,
+            'duration_seconds': round(time.time() - self.started, 3),
+            'counters': counters,
+            'histograms': histograms,
+            'failures': failures,
+        }
+
+    def to_prometheus(self, prefix='spelling_audio_'):
+        """Return the collected metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted(set(self.counters) | set(self.histograms)):
+                kind, help_text = METRIC_HELP.get(name, ('untyped', name))
+                full = prefix + name
+                lines.append(f'# HELP {full} {help_text}')
+                lines.append(f'# TYPE {full} {kind}')
+                for key, value in sorted(self.counters.get(name, {}).items()):
+                    lines.append(f'{full}{_format_labels(key)} {value}')
+                for key, h in sorted(self.histograms.get(name, {}).items()):
+                    for bound, count in h.cumulative():
+                        lines.append(f'{full}_bucket{_format_labels(key, [("le", bound)])} {count}')
+                    lines.append(f'{full}_bucket{_format_labels(key, [("le", "+Inf")])} {h.count}')
+                    lines.append(f'{full}_sum{_format_labels(key)} {h.sum:.6f}')
+                    lines.append(f'{full}_count{_format_labels(key)} {h.count}')
+            lines.append(f'# TYPE {prefix}last_run_timestamp_seconds gauge')
+            lines.append(f'{prefix}last_run_timestamp_seconds {self.started:.0f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path):
+        write_atomic(path, json.dumps(self.to_json(), indent=1).encode('utf-8'))
+
+    def write_prometheus(self, path):
+        # Atomic rename, as the textfile collector may read at any moment
+        write_atomic(path, self.to_prometheus().encode('utf-8'))
+
+    def write_failures(self, path):
+        """Write just the failure list, for generate_audio.py --retry-failures."""
+        with self._lock:
+            failures = list(self.failures)
+        write_atomic(path, json.dumps(failures, indent=1).encode('utf-8'))
+
+
+class NullMetrics:
+    """Drop-in Metrics replacement that records nothing."""
+
+    failures = ()
+
+    def inc(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+    def span(self, name, **labels):
+        return nullcontext()
+
+    def record_failure(self, word, error, grades=(None,), **context):
+        pass
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Minimal MP3 frame-header parser.
+
+Walks MPEG audio frame headers without decoding any audio, which is enough to
+find frame boundaries, compute durations and detect truncated files. Works on
+bytes, bytearray, memoryview or mmap objects.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple
+
+# Bitrates in kbps, indexed by (MPEG version 1 or 2, layer) then bitrate index
+BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates in Hz, indexed by the 2-bit version field then sample rate index
+SAMPLE_RATES = {
+    0b11: [44100, 48000, 32000],  # MPEG 1
+    0b10: [22050, 24000, 16000],  # MPEG 2
+    0b00: [11025, 12000, 8000],   # MPEG 2.5
+}
+
+
+class Frame(NamedTuple):
+    offset: int
+    size: int
+    bitrate: int      # bits per second
+    sample_rate: int  # Hz
+    samples: int      # samples per channel in this frame
+    channels: int
+
+    @property
+    def duration(self):
+        return self.samples / self.sample_rate
+
+
+class Mp3Info(NamedTuple):
+    frames: int
+    duration: float     # seconds
+    audio_bytes: int    # bytes covered by complete frames
+    sample_rate: int
+    bitrate: int        # average bits per second
+    truncated: bool     # the last frame runs past the end of the data
+    junk_bytes: int     # bytes that are neither tags nor frames
+
+
+def parse_header(header, offset=0):
+    """Parse a 4-byte frame header; return a Frame or None if it is not valid."""
+    if len(header) < 4:
+        return None
+    fields = _header_fields(bytes(header[:4]))
+    return Frame(offset, *fields) if fields else None
+
+
+@lru_cache(maxsize=256)
+def _header_fields(header):
+    # A stream repeats a handful of distinct headers, so parsing is cached per header
+    b0, b1, b2, b3 = header
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version_bits = (b1 >> 3) & 0b11
+    layer_bits = (b1 >> 1) & 0b11
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0b11
+    if version_bits == 0b01 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    layer = 4 - layer_bits
+    version = 1 if version_bits == 0b11 else 2
+    bitrate = BITRATES[(version, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version_bits][rate_index]
+    padding = (b2 >> 1) & 1
+    channels = 1 if (b3 >> 6) == 0b11 else 2
+
+    if layer == 1:
+        samples = 384
+        size = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or version == 1:
+        samples = 1152
+        size = 144 * bitrate // sample_rate + padding
+    else:
+        # MPEG 2/2.5 Layer III has half as many samples per frame
+        samples = 576
+        size = 72 * bitrate // sample_rate + padding
+    return size, bitrate, sample_rate, samples, channels
+
+
+def skip_id3v2(data):
+    """Return the offset just past a leading ID3v2 tag (0 if there is none)."""
+    if len(data) < 10 or data[0:3] != b'ID3':
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def audio_end(data):
+    """Return the offset where audio ends, excluding a trailing ID3v1 tag."""
+    if len(data) >= 128 and data[-128:-125] == b'TAG':
+        return len(data) - 128
+    return len(data)
+
+
+def iter_frames(data, start=None, end=None):
+    """Yield complete frames in `data`, resynchronizing past junk bytes.
+
+    Iteration stops at `end` (default: before any ID3v1 tag); a frame that
+    would run past it is not yielded.
+    """
+    offset = skip_id3v2(data) if start is None else start
+    end = audio_end(data) if end is None else end
+    while offset + 4 <= end:
+        frame = parse_header(data[offset:offset + 4], offset)
+        if frame is None or frame.size < 4:
+            # Jump to the next candidate sync byte rather than stepping one at a time
+            find = getattr(data, 'find', None)
+            offset = find(b'\xff', offset + 1, end) if find else offset + 1
+            if offset < 0:
+                return
+            continue
+        if offset + frame.size > end:
+            return
+        yield frame
+        offset += frame.size
+
+
+def mp3_info(data):
+    """Summarize an MP3 stream: frame count, duration, bitrate and damage."""
+    start = skip_id3v2(data)
+    end = audio_end(data)
+    frames = 0
+    duration = 0.0
+    audio_bytes = 0
+    sample_rate = 0
+    position = start
+    junk = 0
+    for frame in iter_frames(data, start, end):
+        junk += frame.offset - position
+        position = frame.offset + frame.size
+        frames += 1
+        duration += frame.duration
+        audio_bytes += frame.size
+        sample_rate = sample_rate or frame.sample_rate
+
+    remaining = end - position
+    truncated = False
+    if remaining >= 4 and parse_header(data[position:position + 4]) is not None:
+        truncated = True
+    elif remaining > 0:
+        junk += remaining
+    bitrate = int(audio_bytes * 8 / duration) if duration else 0
+    return Mp3Info(frames, duration, audio_bytes, sample_rate, bitrate, truncated, junk)
+
+
+def mp3_duration(data):
+    """Duration of an MP3 stream in seconds, from its frame headers."""
+    return sum(frame.duration for frame in iter_frames(data))
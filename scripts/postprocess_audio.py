@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Post-process generated audio: trim silence, normalize loudness, re-encode.
+
+The MP3s from generate_audio.py are stored exactly as the API returns them,
+with leading/trailing silence (which delays the cue in the player), varying
+loudness, and more bytes than a single spoken word needs. This stage runs
+ffmpeg over every file under audio/<grade>/ on a process pool to:
+
+- trim leading and trailing silence (keeping a short pad)
+- normalize loudness to a target (EBU R128, default -16 LUFS)
+- re-encode as a compact mono MP3, or as an Opus variant with --format opus
+
+It reports size and duration before and after for every file. Processed files
+are recorded in audio/postprocess.json, so re-runs only touch files that are
+new or have changed since (e.g. re-synthesized words).
+
+Requires ffmpeg on the PATH.
+
+Usage:
+    python postprocess_audio.py [--audio-dir ../audio] [--workers N]
+                                [--target-lufs -16] [--bitrate 48k] [--format mp3|opus]
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from audio_cache import MANIFEST_NAME, BuildManifest, write_atomic
+from mp3_frames import mp3_duration
+
+STATE_NAME = 'postprocess.json'
+STATE_VERSION = 1
+
+# Silence below this level at either end is trimmed
+SILENCE_THRESHOLD = '-50dB'
+# Silence kept before and after the word, in seconds
+LEAD_SECONDS = 0.05
+TAIL_SECONDS = 0.1
+
+
+def filter_chain(target_lufs):
+    """ffmpeg audio filter that trims both ends, pads slightly and normalizes loudness."""
+    trim = f'silenceremove=start_periods=1:start_threshold={SILENCE_THRESHOLD}:detection=peak'
+    return ','.join([
+        trim,
+        'areverse', trim, 'areverse',
+        f'adelay={int(LEAD_SECONDS * 1000)}:all=1',
+        f'apad=pad_dur={TAIL_SECONDS}',
+        f'loudnorm=I={target_lufs}:TP=-1.5:LRA=11',
+    ])
+
+
+def encoder_args(fmt, bitrate, sample_rate):
+    if fmt == 'opus':
+        return ['-c:a', 'libopus', '-b:a', bitrate, '-ac', '1', '-f', 'opus']
+    return ['-c:a', 'libmp3lame', '-b:a', bitrate, '-ac', '1', '-ar', str(sample_rate), '-f', 'mp3']
+
+
+def probe_duration(path):
+    """Duration in seconds: MP3s from their frame headers, anything else via ffprobe."""
+    path = Path(path)
+    if path.suffix == '.mp3':
+        return mp3_duration(path.read_bytes())
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', str(path)],
+        capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip() or 0)
+
+
+def ignore_interrupts():
+    """Pool initializer: Ctrl-C is handled by the main process, so a worker never stops
+    between rewriting a file and reporting it."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def process_file(task):
+    """Process one file (runs in a worker process); returns a report dict."""
+    source, output, settings = task
+    before_bytes = os.path.getsize(source)
+    before_seconds = probe_duration(source)
+
+    command = [
+        'ffmpeg', '-nostdin', '-v', 'error', '-i', str(source),
+        '-af', filter_chain(settings['target_lufs']),
+        '-map_metadata', '-1',
+        *encoder_args(settings['format'], settings['bitrate'], settings['sample_rate']),
+        'pipe:1',
+    ]
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip() or 'ffmpeg produced no output')
+
+    # Written atomically, so an interrupted run never leaves a damaged file
+    write_atomic(output, result.stdout)
+    return {
+        'file': str(source),
+        'output': str(output),
+        'before_bytes': before_bytes,
+        'after_bytes': len(result.stdout),
+        'before_seconds': round(before_seconds, 3),
+        'after_seconds': round(probe_duration(output), 3),
+    }
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def settings_digest(settings):
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def load_state(path, digest):
+    """Load the record of processed files; settings changes invalidate it."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if state.get('version') != STATE_VERSION or state.get('settings') != digest:
+        return {}
+    return state.get('files', {})
+
+
+def save_state(path, digest, files):
+    data = {'version': STATE_VERSION, 'settings': digest, 'files': files}
+    write_atomic(path, json.dumps(data).encode('utf-8'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Trim, normalize and re-encode generated audio')
+    parser.add_argument('--audio-dir', type=Path, default=Path(__file__).resolve().parent.parent / 'audio',
+                        help='Directory containing the <grade>/ folders (default: ../audio)')
+    parser.add_argument('--output-dir', type=Path, default=None,
+                        help='Write results here instead of replacing the files in place')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: one per CPU)')
+    parser.add_argument('--target-lufs', type=float, default=-16.0,
+                        help='Integrated loudness target in LUFS (default: -16)')
+    parser.add_argument('--format', choices=['mp3', 'opus'], default='mp3',
+                        help='Output encoding (default: mp3)')
+    parser.add_argument('--bitrate', default=None,
+                        help='Output bitrate (default: 48k for mp3, 24k for opus)')
+    parser.add_argument('--sample-rate', type=int, default=24000,
+                        help='MP3 output sample rate in Hz (default: 24000)')
+    parser.add_argument('--force', action='store_true',
+                        help='Process every file, ignoring the record of processed files')
+    parser.add_argument('--report', type=Path, default=None,
+                        help='Write the per-file before/after report to this JSON file')
+    args = parser.parse_args(argv)
+
+    if not shutil.which('ffmpeg') or (args.format != 'mp3' and not shutil.which('ffprobe')):
+        print("❌ Error: ffmpeg (and ffprobe) must be installed and on the PATH.")
+        sys.exit(1)
+
+    settings = {
+        'format': args.format,
+        'bitrate': args.bitrate or ('24k' if args.format == 'opus' else '48k'),
+        'sample_rate': args.sample_rate,
+        'target_lufs': args.target_lufs,
+    }
+    base_dir = args.audio_dir
+    output_dir = args.output_dir or base_dir
+    in_place = output_dir.resolve() == base_dir.resolve() and args.format == 'mp3'
+    state_path = output_dir / STATE_NAME
+    digest = settings_digest(settings)
+    processed = {} if args.force else load_state(state_path, digest)
+
+    # Per-word files only; bundles built by build_bundle.py live at the top level
+    tasks = []
+    for source in sorted(base_dir.rglob('*.mp3')):
+        if source.parent == base_dir:
+            continue
+        rel = source.relative_to(base_dir).as_posix()
+        output = output_dir / Path(rel).with_suffix('.' + args.format)
+        if processed.get(rel) == file_signature(source) and output.exists():
+            continue
+        output.parent.mkdir(parents=True, exist_ok=True)
+        tasks.append((source, output, settings))
+
+    print(f"Post-processing {len(tasks)} file(s) with {args.workers} worker(s) "
+          f"({settings['format']} {settings['bitrate']}, {settings['target_lufs']} LUFS)")
+    print("=" * 60)
+    if not tasks:
+        print("✅ Everything is up to date")
+        return
+
+    # Keep generate_audio.py's manifest in step with files rewritten in place
+    manifest_path = base_dir / MANIFEST_NAME
+    manifest = BuildManifest(manifest_path) if in_place and manifest_path.exists() else None
+
+    reports = []
+    failures = 0
+
+    def save():
+        save_state(state_path, digest, processed)
+        if manifest:
+            manifest.save()
+
+    def record(future, task):
+        nonlocal failures
+        source, output, _ = task
+        rel = source.relative_to(base_dir).as_posix()
+        try:
+            report = future.result()
+        except Exception as e:
+            failures += 1
+            print(f"  ❌ {rel}: {e}")
+            return
+        reports.append(report)
+        processed[rel] = file_signature(source)
+        if manifest:
+            manifest.refresh(output, report['after_bytes'])
+        print(f"  [{len(reports) + failures}/{len(tasks)}] {rel}: "
+              f"{report['before_bytes']:,} → {report['after_bytes']:,} bytes, "
+              f"{report['before_seconds']:.2f}s → {report['after_seconds']:.2f}s")
+
+    # Two tasks per worker are queued at a time, so Ctrl-C only waits for the files in progress.
+    # Their results and both records are saved either way, so the next run (and
+    # generate_audio.py's manifest check) picks up exactly where this one stopped
+    workers = max(1, args.workers)
+    pending = {}
+    remaining = iter(tasks)
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=ignore_interrupts)
+    try:
+        while True:
+            for task in itertools.islice(remaining, 2 * workers - len(pending)):
+                pending[pool.submit(process_file, task)] = task
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                record(future, pending.pop(future))
+                if (len(reports) + failures) % 50 == 0:
+                    save()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        # Files that finished while shutting down were rewritten; record them too
+        for future, task in pending.items():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                record(future, task)
+        save()
+
+    before_bytes = sum(r['before_bytes'] for r in reports)
+    after_bytes = sum(r['after_bytes'] for r in reports)
+    before_seconds = sum(r['before_seconds'] for r in reports)
+    after_seconds = sum(r['after_seconds'] for r in reports)
+    print("\n" + "=" * 60)
+    print(f"✅ Processed {len(reports)}/{len(tasks)} file(s)" + (f", {failures} failed" if failures else ""))
+    if reports:
+        print(f"Size: {before_bytes / 1024 / 1024:.2f} MB → {after_bytes / 1024 / 1024:.2f} MB "
+              f"({(1 - after_bytes / before_bytes) * 100:.0f}% smaller)")
+        print(f"Audio: {before_seconds:.0f}s → {after_seconds:.0f}s")
+    if args.report:
+        args.report.write_text(json.dumps(reports, indent=1), encoding='utf-8')
+        print(f"Report written to {args.report}")
+
+
+if __name__ == '__main__':
+    main()
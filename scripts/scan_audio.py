@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Check the generated audio against the word lists and write a duration index.
+
+Walks every <grade>/ folder of the audio tree (including the
+<voice>/<grade>/ folders of a voice matrix run) and parses each MP3's frame
+headers on a process pool, without decoding any audio. Each word in the
+lists is cross-checked against its file through sanitize_filename(), and
+these problems are reported:
+
+- missing: no file for a word
+- empty / undecodable: the file has no bytes, or no MPEG frames
+- truncated: the last frame runs past the end of the file
+- corrupt: bytes that are neither tags nor frames, e.g. garbage before the
+  first frame or between frames (random data often contains a false frame sync)
+- orphaned: a file that no word in the list maps to
+- collision: different words that map to the same file name
+- player mismatch: app.js's sanitizeFilename() maps the word to another
+  file name than generate_audio.py did, so the player would not find it
+
+The durations of healthy files are written to durations.json next to the
+<grade>/ folders ({"gr23": {"abduction": 712, ...}}, in milliseconds), which
+the player uses to time the halfway repeat and to skip its load probe for
+files known to be good. Exits with status 1 if any problem was found.
+
+Usage:
+    python scan_audio.py [--audio-dir ../audio] [--words-json words.json] [--report report.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from audio_cache import write_atomic
+from generate_audio import SPELLING_WORDS_GR23, SPELLING_WORDS_GR45, load_word_lists, normalize_text, sanitize_filename
+from mp3_frames import mp3_info
+
+INDEX_NAME = 'durations.json'
+# Files per worker task; large enough that pool overhead stays small
+CHUNK_SIZE = 256
+PROBLEMS = ['missing', 'empty', 'undecodable', 'truncated', 'corrupt', 'orphaned', 'collision', 'player_mismatch']
+
+
+def player_filename(word):
+    """The file name app.js's sanitizeFilename() asks for (runs of whitespace become one "_")."""
+    return re.sub(r'[^a-z0-9_-]', '', re.sub(r'\s+', '_', word.lower()))
+
+
+def scan_files(paths):
+    """Frame-scan a chunk of files (runs in worker processes); returns (path, size, info) tuples."""
+    results = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        results.append((path, len(data), mp3_info(data) if data else None))
+    return results
+
+
+def find_grade_dirs(base_dir, grades):
+    """Return {layout root: [grade, ...]} for <base>/<grade>/ and <base>/<voice>/<grade>/ folders."""
+    layouts = {}
+    roots = [base_dir] + sorted(p for p in base_dir.iterdir() if p.is_dir() and p.name not in grades)
+    for root in roots:
+        found = [grade for grade in grades if (root / grade).is_dir()]
+        if found:
+            layouts[root] = found
+    return layouts
+
+
+def expected_files(words):
+    """Map file stem -> words for one list, plus the problems visible from names alone."""
+    stems = {}
+    problems = []
+    for word in words:
+        stem = sanitize_filename(word)
+        if not stem:
+            problems.append(('missing', word, 'word has no usable file name'))
+            continue
+        stems.setdefault(stem, {}).setdefault(normalize_text(word), word)
+        if player_filename(word) != stem:
+            problems.append(('player_mismatch', word, f'player requests {player_filename(word)}.mp3, file is {stem}.mp3'))
+    for stem, variants in stems.items():
+        # Spellings that only differ in case or spacing share one recording; anything else collides
+        if len(variants) > 1:
+            problems.append(('collision', stem, ' / '.join(variants.values())))
+    return stems, problems
+
+
+def scan(base_dir, word_lists, workers):
+    """Scan the tree; returns (problems, {layout root: {grade: {stem: ms}}}, files scanned)."""
+    layouts = find_grade_dirs(base_dir, word_lists)
+    paths = [str(path) for root, grades in layouts.items() for grade in grades
+             for path in sorted((root / grade).glob('*.mp3'))]
+
+    chunks = [paths[i:i + CHUNK_SIZE] for i in range(0, len(paths), CHUNK_SIZE)]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            scanned = [result for chunk in pool.map(scan_files, chunks) for result in chunk]
+    else:
+        scanned = [result for chunk in chunks for result in scan_files(chunk)]
+    by_dir = {}
+    for path, size, info in scanned:
+        path = Path(path)
+        by_dir.setdefault(path.parent, {})[path.stem] = (size, info)
+
+    problems = []
+    indexes = {}
+    for root, grades in layouts.items():
+        for grade in grades:
+            grade_dir = root / grade
+            label = grade_dir.relative_to(base_dir).as_posix()
+            stems, name_problems = expected_files(word_lists[grade])
+            problems += [(kind, label, subject, detail) for kind, subject, detail in name_problems]
+            durations = indexes.setdefault(root, {}).setdefault(grade, {})
+
+            on_disk = by_dir.get(grade_dir, {})
+            for stem in sorted(on_disk - stems.keys()):
+                problems.append(('orphaned', label, f'{stem}.mp3', 'no word in the list maps to this file'))
+            for stem in stems:
+                if stem not in on_disk:
+                    problems.append(('missing', label, f'{stem}.mp3', next(iter(stems[stem].values()))))
+                    continue
+                size, info = on_disk[stem]
+                if not size:
+                    problems.append(('empty', label, f'{stem}.mp3', '0 bytes'))
+                elif not info.frames:
+                    problems.append(('undecodable', label, f'{stem}.mp3', f'no MPEG frames in {size} bytes'))
+                elif info.truncated:
+                    problems.append(('truncated', label, f'{stem}.mp3',
+                                     f'last frame cut short after {info.audio_bytes} of {size} bytes'))
+                elif info.junk_bytes:
+                    problems.append(('corrupt', label, f'{stem}.mp3',
+                                     f'{info.junk_bytes} of {size} bytes are not MPEG frames'))
+                else:
+                    durations[stem] = round(info.duration * 1000)
+    return problems, indexes, len(paths)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check generated audio and write a duration index')
+    parser.add_argument('--audio-dir', type=Path, default=Path(__file__).resolve().parent.parent / 'audio',
+                        help='Directory containing the <grade>/ (or <voice>/<grade>/) folders (default: ../audio)')
+    parser.add_argument('--words-json', type=Path, default=None,
+                        help='Check against word lists from extract_pdf.py --json instead of the built-in lists')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: one per CPU)')
+    parser.add_argument('--report', type=Path, default=None,
+                        help='Write every problem found to this JSON file')
+    parser.add_argument('--no-index', action='store_true',
+                        help=f'Do not write {INDEX_NAME}')
+    args = parser.parse_args(argv)
+
+    if args.words_json:
+        word_lists = load_word_lists(args.words_json)
+    else:
+        word_lists = {'gr23': SPELLING_WORDS_GR23, 'gr45': SPELLING_WORDS_GR45}
+
+    start = time.perf_counter()
+    problems, indexes, scanned = scan(args.audio_dir, word_lists, args.workers)
+    elapsed = time.perf_counter() - start
+
+    if not args.no_index:
+        for root, index in indexes.items():
+            write_atomic(root / INDEX_NAME, json.dumps(index, separators=(',', ':'), sort_keys=True).encode('utf-8'))
+
+    print(f"Scanned {scanned} file(s) in {len(indexes)} layout(s) in {elapsed:.2f}s")
+    print("=" * 60)
+    for kind in PROBLEMS:
+        found = [problem for problem in problems if problem[0] == kind]
+        if not found:
+            continue
+        print(f"{kind.replace('_', ' ')}: {len(found)}")
+        for _, label, subject, detail in found[:10]:
+            print(f"  ❌ {label}/{subject}: {detail}")
+        if len(found) > 10:
+            print(f"  ... and {len(found) - 10} more")
+    if args.report:
+        report = [dict(zip(('problem', 'folder', 'file', 'detail'), problem)) for problem in problems]
+        write_atomic(args.report, json.dumps(report, indent=1).encode('utf-8'))
+        print(f"Report written to {args.report}")
+
+    if problems:
+        print(f"\n❌ {len(problems)} problem(s) found")
+        sys.exit(1)
+    print("✅ All audio present and intact")
+
+
+if __name__ == '__main__':
+    main()
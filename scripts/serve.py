@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Local static server for the spelling dictator.
+
+Serves the player's files from the site root (index.html, top-level .js/.css,
+asset-manifest.json and audio/; never scripts/ or other repo files) for
+classroom or hosted use, tuned for this layout:
+
+- file bodies are sent with zero-copy sendfile(), over keep-alive connections
+- HTTP Range requests (single range) for audio seeking, with If-Range
+- ETag / If-None-Match revalidation, using the content hashes from
+  asset-manifest.json (scripts/build_assets.py) where available
+- `Cache-Control: immutable` for hashed URLs (`app.js?v=<hash>`, as requested
+  by sw.js); everything else is revalidated with a cheap 304
+- precompressed .br/.gz copies of text assets when they exist and the client
+  accepts them
+- one thread per connection, so many clients can stream at once
+
+--load-test starts the server on a spare port (or targets --url) and reports
+requests per second from concurrent keep-alive clients.
+
+Usage:
+    python serve.py [--port 8000] [--bind 0.0.0.0]
+    python serve.py --load-test --clients 50 --duration 10
+"""
+
+import argparse
+import email.utils
+import http.client
+import json
+import mimetypes
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from audio_cache import MANIFEST_NAME as AUDIO_MANIFEST_NAME
+from build_assets import MANIFEST_NAME, TEXT_SUFFIXES
+from metrics import latency_summary
+from postprocess_audio import STATE_NAME as POSTPROCESS_STATE_NAME
+
+DEFAULT_ROOT = Path(__file__).resolve().parent.parent
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8',
+    '.json': 'application/json',
+    '.mp3': 'audio/mpeg',
+    '.opus': 'audio/ogg',
+}
+# Preferred first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class AssetHashes:
+    """Content hashes from asset-manifest.json, reloaded when the file changes."""
+
+    def __init__(self, root):
+        self.path = root / MANIFEST_NAME
+        self.hashes = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def get(self, rel, stat):
+        """Hash of `rel`, if the manifest entry still matches the file's size and mtime."""
+        try:
+            manifest = self.path.stat()
+            stamp = (manifest.st_size, manifest.st_mtime_ns)
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    self.hashes = self._load() if stamp else {}
+                    self._stamp = stamp
+        entry = self.hashes.get(rel)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['hash']
+        return None
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f).get('files', {})
+        except (OSError, ValueError):
+            return {}
+
+
+def parse_range(header, size):
+    """Return (start, end) inclusive for a single `bytes=` range, None to ignore it, or
+    ValueError if it cannot be satisfied."""
+    match = RANGE.match(header.strip())
+    if not match or match.group(0) == 'bytes=-':
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, size - int(last))
+        end = size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+def etag_matches(header, etag):
+    if header.strip() == '*':
+        return True
+    # Weak comparison, as If-None-Match requires
+    tags = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return etag.removeprefix('W/') in tags
+
+
+def is_public(rel):
+    """Whether a root-relative path is part of the player (never scripts/, requests or build state)."""
+    if rel.startswith('audio/'):
+        # generate_audio.py / postprocess_audio.py keep their build state next to the audio
+        return rel.rsplit('/', 1)[-1] not in (AUDIO_MANIFEST_NAME, POSTPROCESS_STATE_NAME)
+    return '/' not in rel and (rel in ('index.html', MANIFEST_NAME) or rel.endswith(('.js', '.css')))
+
+
+class StaticHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'SpellingDictator'
+    # Headers and sendfile() body go out as separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+    root = DEFAULT_ROOT
+    hashes = None
+    verbose = False
+
+    def do_GET(self):
+        self.serve(send_body=True)
+
+    def do_HEAD(self):
+        self.serve(send_body=False)
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+    def resolve(self, url_path):
+        """Map a URL path to (relative path, file path) of a player asset, or None."""
+        rel = urllib.parse.unquote(url_path).lstrip('/') or 'index.html'
+        if rel.endswith('/'):
+            rel += 'index.html'
+        parts = rel.split('/')
+        # No parent references, no dotfiles (.git, .venv, ...), and nothing outside the player
+        if any(part in ('', '..') or part.startswith('.') for part in parts) or not is_public(rel):
+            return None
+        path = self.root.joinpath(*parts)
+        try:
+            # Symlinks must not lead out of the root
+            path.resolve(strict=True).relative_to(self.root)
+        except (OSError, ValueError):
+            return None
+        return (rel, path) if path.is_file() else None
+
+    def choose_encoding(self, path):
+        """Pick a precompressed variant the client accepts: (encoding, variant path, stat)."""
+        if path.suffix not in TEXT_SUFFIXES:
+            return None, path, path.stat()
+        accepted = {token.split(';')[0].strip() for token in self.headers.get('Accept-Encoding', '').split(',')}
+        source = path.stat()
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            variant = path.with_name(path.name + suffix)
+            try:
+                stat = variant.stat()
+            except FileNotFoundError:
+                continue
+            # A variant older than its source is stale (source edited since the build)
+            if stat.st_mtime_ns >= source.st_mtime_ns:
+                return encoding, variant, stat
+        return None, path, source
+
+    def serve(self, send_body):
+        url = urllib.parse.urlsplit(self.path)
+        resolved = self.resolve(url.path)
+        if resolved is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        rel, path = resolved
+        encoding, file_path, stat = self.choose_encoding(path)
+
+        # Files edited since the last build_assets.py run get a size/mtime ETag instead
+        content_hash = self.hashes.get(rel, path.stat() if encoding else stat) if self.hashes else None
+        etag = f'"{content_hash}"' if content_hash else f'W/"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        if encoding:
+            etag = etag[:-1] + f'-{encoding}"'
+        query = urllib.parse.parse_qs(url.query)
+        cache_control = IMMUTABLE if content_hash and query.get('v') == [content_hash] else REVALIDATE
+
+        def common_headers():
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+            self.send_header('Last-Modified', email.utils.formatdate(stat.st_mtime, usegmt=True))
+            if path.suffix in TEXT_SUFFIXES:
+                self.send_header('Vary', 'Accept-Encoding')
+
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match and etag_matches(if_none_match, etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            common_headers()
+            self.end_headers()
+            return
+
+        size = stat.st_size
+        start, end = 0, size - 1
+        status = HTTPStatus.OK
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        # Ranges apply to the identity encoding only; If-Range must name the current version
+        # with a strong ETag, since a weak (size-mtime) one cannot vouch for the bytes (RFC 9110)
+        if_range_ok = not if_range or (if_range.strip() == etag and not etag.startswith('W/'))
+        if range_header and not encoding and if_range_ok:
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if byte_range:
+                start, end = byte_range
+                status = HTTPStatus.PARTIAL_CONTENT
+
+        length = end - start + 1 if size else 0
+        self.send_response(status)
+        common_headers()
+        content_type = CONTENT_TYPES.get(path.suffix) or mimetypes.guess_type(path.name)[0]
+        self.send_header('Content-Type', content_type or 'application/octet-stream')
+        self.send_header('Accept-Ranges', 'bytes')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.send_header('Content-Length', str(length))
+        self.end_headers()
+
+        if send_body and length:
+            with open(file_path, 'rb') as f:
+                # Zero-copy where the platform supports it (socket.sendfile falls back to send)
+                self.connection.sendfile(f, offset=start, count=length)
+
+
+class StaticServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # A classroom of devices may connect at once
+    request_queue_size = 128
+
+
+def make_server(root, bind, port, verbose=False):
+    root = root.resolve()
+    handler = type('Handler', (StaticHandler,), {
+        'root': root,
+        'hashes': AssetHashes(root),
+        'verbose': verbose,
+    })
+    return StaticServer((bind, port), handler)
+
+
+def load_test(url, paths, clients, duration):
+    """Fetch `paths` from `url` with `clients` keep-alive connections for `duration` seconds."""
+    target = urllib.parse.urlsplit(url)
+    deadline = time.perf_counter() + duration
+    results = []
+    lock = threading.Lock()
+
+    def client(seed):
+        rng = random.Random(seed)
+        latencies = []
+        received = 0
+        errors = 0
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=10)
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            start = time.perf_counter()
+            try:
+                conn.request('GET', '/' + urllib.parse.quote(path), headers={'Accept-Encoding': 'br, gzip'})
+                response = conn.getresponse()
+                received += len(response.read())
+                if response.status != 200:
+                    errors += 1
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=10)
+                continue
+            latencies.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            results.append((latencies, received, errors))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for result in results for latency in result[0]]
+    received = sum(result[1] for result in results)
+    summary = latency_summary(latencies)
+    summary.update({
+        'clients': clients,
+        'errors': sum(result[2] for result in results),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'megabytes_per_second': round(received / elapsed / (1024 * 1024), 2),
+    })
+    return summary
+
+
+def site_paths(root):
+    """URL paths for the load test: the app shell plus every audio file."""
+    paths = [name for name in ('index.html', 'style.css', 'words.js', 'app.js') if (root / name).exists()]
+    audio_dir = root / 'audio'
+    if audio_dir.is_dir():
+        paths += [path.relative_to(root).as_posix() for path in sorted(audio_dir.rglob('*.mp3'))]
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the spelling dictator over HTTP')
+    parser.add_argument('--root', type=Path, default=DEFAULT_ROOT,
+                        help='Site root containing index.html and audio/ (default: ..)')
+    parser.add_argument('--bind', default='127.0.0.1',
+                        help='Address to listen on; 0.0.0.0 for other devices (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='Port (default: 8000)')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    parser.add_argument('--load-test', action='store_true',
+                        help='Measure requests per second instead of serving')
+    parser.add_argument('--url', default=None,
+                        help='Load-test this server instead of starting one (e.g. http://host:8000)')
+    parser.add_argument('--clients', type=int, default=50,
+                        help='Concurrent load-test connections (default: 50)')
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help='Load-test duration in seconds (default: 10)')
+    args = parser.parse_args(argv)
+
+    root = args.root.resolve()
+    if not args.load_test:
+        server = make_server(root, args.bind, args.port, args.verbose)
+        print(f"Serving {root} at http://{args.bind}:{args.port}/ (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nStopped")
+        finally:
+            server.server_close()
+        return
+
+    server = None
+    url = args.url
+    if not url:
+        server = make_server(root, '127.0.0.1', 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+    paths = site_paths(root)
+    print(f"Load test: {args.clients} client(s) for {args.duration:g}s against {url} ({len(paths)} paths)")
+    summary = load_test(url, paths, args.clients, args.duration)
+    if server:
+        server.shutdown()
+        server.server_close()
+    print(f"✅ {summary['requests_per_second']:,} requests/s, {summary['megabytes_per_second']} MB/s, "
+          f"{summary['errors']} error(s)")
+    print(f"   latency p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms "
+          f"over {summary['requests']:,} requests")
+
+
+if __name__ == '__main__':
+    main()
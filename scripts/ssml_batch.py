@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Batched SSML synthesis: many words per TTS request.
+
+build_ssml() wraps each word in a pair of <mark> tags separated by pauses.
+The backend returns one MP3 plus the time offset of every mark, and
+split_by_marks() cuts that MP3 at frame boundaries into one clip per word.
+A word whose marks are missing or inconsistent is returned as None so the
+caller can fall back to a single-word request for it.
+
+MP3 frames may borrow bits from the preceding frame (the bit reservoir), so
+every clip starts inside the pause before its word rather than right at it;
+the first frame or two only ever carry silence.
+
+Run this module (python ssml_batch.py) for an offline check of
+split_by_marks() against FakeTTSBackend's batched output.
+"""
+
+import bisect
+import sys
+from xml.sax.saxutils import escape
+
+from mp3_frames import iter_frames, mp3_duration
+
+BREAK_MS = 600
+# Silence kept on either side of each word, in seconds
+PAD_SECONDS = 0.15
+
+
+def start_mark(index):
+    return f"s{index}"
+
+
+def end_mark(index):
+    return f"e{index}"
+
+
+def build_ssml(words, break_ms=BREAK_MS):
+    """Return an SSML document that speaks `words` with marks around each one."""
+    parts = ['<speak>']
+    for i, word in enumerate(words):
+        parts.append(f'<break time="{break_ms}ms"/>')
+        parts.append(f'<mark name="{start_mark(i)}"/>{escape(word)}<mark name="{end_mark(i)}"/>')
+    parts.append(f'<break time="{break_ms}ms"/></speak>')
+    return ''.join(parts)
+
+
+def split_by_marks(audio, timepoints, count, pad=PAD_SECONDS):
+    """Split batched MP3 audio into `count` per-word clips.
+
+    `timepoints` maps mark names to offsets in seconds. Returns a list with
+    the clip bytes for each word, or None where the word cannot be cut out
+    reliably.
+    """
+    frames = list(iter_frames(audio))
+    if not frames:
+        return [None] * count
+
+    # Start time of every frame, plus the end of the stream
+    starts = [0.0]
+    for frame in frames:
+        starts.append(starts[-1] + frame.duration)
+    total = starts[-1]
+
+    bounds = []
+    for i in range(count):
+        start = timepoints.get(start_mark(i))
+        end = timepoints.get(end_mark(i))
+        if start is None or end is None or not 0 <= start < end <= total + 1e-6:
+            bounds.append(None)
+        else:
+            bounds.append((start, end))
+
+    clips = []
+    for i, bound in enumerate(bounds):
+        if bound is None:
+            clips.append(None)
+            continue
+        start, end = bound
+        # Pad into the surrounding pauses without reaching a neighbouring word
+        previous_end = bounds[i - 1][1] if i > 0 and bounds[i - 1] else 0.0
+        next_start = bounds[i + 1][0] if i + 1 < count and bounds[i + 1] else total
+        if start < previous_end or end > next_start:
+            clips.append(None)
+            continue
+        clip_start = max(previous_end + (start - previous_end) / 2, start - pad)
+        clip_end = min(next_start - (next_start - end) / 2, end + pad)
+
+        first = bisect.bisect_right(starts, clip_start) - 1
+        last = bisect.bisect_left(starts, clip_end, lo=first + 1)
+        last = min(last, len(frames))
+        if last <= first:
+            clips.append(None)
+            continue
+        clips.append(bytes(audio[frames[first].offset:frames[last - 1].offset + frames[last - 1].size]))
+    return clips
+
+
+def self_check():
+    """Split FakeTTSBackend batches with intact, missing, out-of-order and
+    out-of-range marks; returns a list of failure messages (empty if all pass)."""
+    from tts_backends import FakeTTSBackend
+
+    words = ['atom', 'yard sale', 'encyclopedia', 'ox', 'do-it-yourself']
+    failures = []
+
+    def check(name, timepoints, audio, expect_none=()):
+        clips = split_by_marks(audio, timepoints, len(words))
+        if len(clips) != len(words):
+            failures.append(f'{name}: {len(clips)} clips for {len(words)} words')
+            return
+        total = mp3_duration(audio) if audio else 0.0
+        frame = max((f.duration for f in iter_frames(audio)), default=0.0)
+        for i, clip in enumerate(clips):
+            if i in expect_none:
+                if clip is not None:
+                    failures.append(f'{name}: word {i} should fall back (None)')
+                continue
+            if clip is None:
+                failures.append(f'{name}: word {i} was not cut out')
+                continue
+            # The clip covers the word and its padding (half of each pause at most),
+            # rounded out to whole frames
+            spoken = timepoints[end_mark(i)] - timepoints[start_mark(i)]
+            padding = 2 * min(PAD_SECONDS, BREAK_MS / 2000)
+            duration = mp3_duration(clip)
+            if not spoken + padding - 1e-6 <= duration <= min(total, spoken + padding + 2 * frame) + 1e-6:
+                failures.append(f'{name}: word {i} clip is {duration:.3f}s for {spoken:.3f}s of speech')
+
+    backend = FakeTTSBackend(latency=0, seed=0)
+    audio, timepoints = backend.synthesize_marked(build_ssml(words), 'fake')
+    check('intact', timepoints, audio)
+
+    missing = dict(timepoints)
+    del missing[start_mark(1)], missing[end_mark(3)]
+    check('missing marks', missing, audio, expect_none={1, 3})
+
+    swapped = dict(timepoints)
+    swapped[start_mark(2)], swapped[end_mark(2)] = timepoints[end_mark(2)], timepoints[start_mark(2)]
+    check('start after end', swapped, audio, expect_none={2})
+
+    # Word 4 starting inside word 3 leaves no pause to cut in, so neither is trusted
+    overlapping = dict(timepoints)
+    overlapping[start_mark(4)] = (timepoints[start_mark(3)] + timepoints[end_mark(3)]) / 2
+    check('overlapping words', overlapping, audio, expect_none={3, 4})
+
+    beyond = dict(timepoints)
+    beyond[end_mark(4)] = mp3_duration(audio) + 1.0
+    check('mark past the end', beyond, audio, expect_none={4})
+
+    check('no audio', timepoints, b'', expect_none=set(range(len(words))))
+
+    dropping = FakeTTSBackend(latency=0, drop_mark_rate=0.3, seed=1)
+    audio, timepoints = dropping.synthesize_marked(build_ssml(words), 'fake')
+    dropped = {i for i in range(len(words))
+               if start_mark(i) not in timepoints or end_mark(i) not in timepoints}
+    check('dropped marks', timepoints, audio, expect_none=dropped)
+    return failures
+
+
+if __name__ == '__main__':
+    problems = self_check()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ split_by_marks() self-check passed")
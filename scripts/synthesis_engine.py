@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Concurrent synthesis engine for generate_audio.py.
+
+SynthesisEngine wraps a TTS backend (see tts_backends.py) and adds:
+- a token-bucket limiter for requests per minute and characters per minute
+- exponential-backoff retries for transient errors
+- a thread pool that keeps up to `workers` requests in flight
+
+The engine exposes the same ``synthesize(text, voice_name)`` method as a
+backend, so it can be passed anywhere a backend is expected. Pass a
+metrics.Metrics instance to record request latencies, retries and billed
+characters.
+"""
+
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import NullMetrics, voice_tier
+from tts_backends import is_transient_error
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate_per_minute` tokens per minute.
+
+    A request larger than the bucket's capacity waits for a full bucket and
+    then drives the balance negative, so the long-run rate is still honoured.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` can be taken from the bucket."""
+        needed = min(tokens, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= needed:
+                    self.tokens -= tokens
+                    return
+                wait = (needed - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class RateLimiter:
+    """Requests-per-minute and characters-per-minute limits (None = unlimited)."""
+
+    def __init__(self, requests_per_minute=None, chars_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.chars = TokenBucket(chars_per_minute) if chars_per_minute else None
+
+    def acquire(self, chars):
+        """Block until one request of `chars` characters is allowed."""
+        if self.requests:
+            self.requests.acquire(1)
+        if self.chars:
+            self.chars.acquire(chars)
+
+
+def call_with_retries(func, max_retries=3, base_delay=0.5, max_delay=30.0,
+                      is_transient=is_transient_error, sleep=time.sleep, on_retry=None):
+    """Call `func()`, retrying transient errors with exponential backoff and jitter."""
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_retries or not is_transient(e):
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            delay *= random.uniform(0.5, 1.0)
+            attempt += 1
+            if on_retry:
+                on_retry(e, attempt, delay)
+            sleep(delay)
+
+
+class SynthesisEngine:
+    """Rate-limited, retrying, concurrent front end for a TTS backend."""
+
+    def __init__(self, backend, workers=1, limiter=None, max_retries=3,
+                 base_delay=0.5, max_delay=30.0, metrics=None):
+        self.backend = backend
+        self.workers = max(1, workers)
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = metrics or NullMetrics()
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def _on_retry(self, error, attempt, delay):
+        with self._lock:
+            self.retries += 1
+        self.metrics.inc('tts_retries_total', error=type(error).__name__)
+
+    def _request(self, kind, call, text, voice_name, **kwargs):
+        """Rate-limit, time and retry one backend call."""
+        def attempt():
+            self.limiter.acquire(len(text))
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = call(text, voice_name, **kwargs)
+                outcome = 'ok'
+                return result
+            finally:
+                self.metrics.observe('tts_request_seconds', time.perf_counter() - start, kind=kind)
+                self.metrics.inc('tts_requests_total', kind=kind, outcome=outcome)
+                if outcome == 'ok':
+                    self.metrics.inc('tts_characters_total', len(text),
+                                     voice=voice_name, tier=voice_tier(voice_name))
+
+        with self.metrics.span('synthesis', kind=kind):
+            return call_with_retries(
+                attempt,
+                max_retries=self.max_retries,
+                base_delay=self.base_delay,
+                max_delay=self.max_delay,
+                on_retry=self._on_retry,
+            )
+
+    def synthesize(self, text, voice_name, **kwargs):
+        """Synthesize `text`, honouring the rate limits and retrying transient errors."""
+        return self._request('single', self.backend.synthesize, text, voice_name, **kwargs)
+
+    def synthesize_marked(self, ssml, voice_name, **kwargs):
+        """Batched SSML request; SSML tags count against the character limit."""
+        return self._request('batch', self.backend.synthesize_marked, ssml, voice_name, **kwargs)
+
+    def run(self, items, task):
+        """Run `task(item)` for every item on the worker pool.
+
+        Yields ``(item, result, error)`` tuples in completion order; exactly
+        one of `result` and `error` is None. At most two jobs per worker are
+        queued at a time, so closing the generator (or Ctrl-C) only waits for
+        the requests already in flight.
+        """
+        items = iter(items)
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        pending = {}
+        try:
+            while True:
+                for item in itertools.islice(items, 2 * self.workers - len(pending)):
+                    pending[pool.submit(task, item)] = item
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        yield item, None, e
+                    else:
+                        yield item, result, None
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
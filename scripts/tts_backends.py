@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Text-to-speech backends used by generate_audio.py.
+
+A backend is any object with a ``synthesize(text, voice_name)`` method that
+returns MP3 bytes. Backends that support batching also provide
+``synthesize_marked(ssml, voice_name)``, which returns the MP3 bytes together
+with a ``{mark_name: seconds}`` dict of SSML mark timepoints.
+
+GoogleTTSBackend talks to Google Cloud Text-to-Speech; FakeTTSBackend is an
+in-process stand-in with configurable latency and error injection, so the
+generation pipeline can be exercised offline.
+"""
+
+import random
+import re
+import threading
+import time
+from xml.sax.saxutils import unescape
+
+LANGUAGE_CODE = "en-US"
+SPEAKING_RATE = 0.9  # Slightly slower for clarity
+
+# Fake MP3 frame: MPEG-2 Layer III, 64 kbps, 24 kHz, mono (same as the Google output)
+FAKE_FRAME_HEADER = b'\xff\xf3\x84\xc4'
+FAKE_FRAME_SIZE = 192
+FAKE_FRAME_SECONDS = 576 / 24000
+
+
+class TransientTTSError(Exception):
+    """A synthesis error that is worth retrying (throttling, timeouts, 5xx)."""
+
+
+def is_transient_error(exc):
+    """Return True if a synthesis error is likely to succeed on retry."""
+    if isinstance(exc, (TransientTTSError, ConnectionError, TimeoutError)):
+        return True
+    try:
+        from google.api_core import exceptions as google_exceptions
+    except ImportError:
+        return False
+    return isinstance(exc, (
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+    ))
+
+
+def fake_mp3(duration):
+    """Build a silent MP3 stream of roughly `duration` seconds."""
+    frame = FAKE_FRAME_HEADER + bytes(FAKE_FRAME_SIZE - len(FAKE_FRAME_HEADER))
+    frames = max(1, round(duration / FAKE_FRAME_SECONDS))
+    return frame * frames
+
+
+def fake_word_seconds(text, speaking_rate=SPEAKING_RATE):
+    """Rough spoken length of `text`, used to size fake audio."""
+    return (0.3 + 0.08 * len(text)) / speaking_rate
+
+
+# <break time="600ms"/>, <mark name="s0"/> or a run of text between tags
+SSML_TOKEN = re.compile(r'<break time="(\d+)ms"/>|<mark name="([^"]+)"/>|<[^>]*>|([^<]+)')
+
+
+class GoogleTTSBackend:
+    """Synthesize speech with Google Cloud Text-to-Speech.
+
+    Batched requests need mark timepoints, which only the v1beta1 API
+    returns; with `timepoints=True` the v1beta1 client serves every call, so
+    single-word and batched requests share one client and connection pool.
+    """
+
+    def __init__(self, client=None, timepoints=False):
+        if timepoints:
+            from google.cloud import texttospeech_v1beta1 as texttospeech
+        else:
+            from google.cloud import texttospeech
+        self.texttospeech = texttospeech
+        self.timepoints = timepoints
+        # The client is thread-safe, so one instance is shared by all workers
+        self.client = client or texttospeech.TextToSpeechClient()
+
+    def synthesize(self, text, voice_name, speaking_rate=SPEAKING_RATE):
+        """Return MP3 bytes for `text` spoken by `voice_name`."""
+        texttospeech = self.texttospeech
+
+        # Set up the synthesis input
+        synthesis_input = texttospeech.SynthesisInput(text=text)
+
+        # Set up the voice parameters
+        voice = texttospeech.VoiceSelectionParams(
+            language_code=LANGUAGE_CODE,
+            name=voice_name
+        )
+
+        # Set up the audio config
+        audio_config = texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.MP3,
+            speaking_rate=speaking_rate
+        )
+
+        # Perform the text-to-speech request
+        response = self.client.synthesize_speech(
+            input=synthesis_input,
+            voice=voice,
+            audio_config=audio_config
+        )
+        return response.audio_content
+
+    def synthesize_marked(self, ssml, voice_name, speaking_rate=SPEAKING_RATE):
+        """Return (MP3 bytes, {mark_name: seconds}) for an SSML document with <mark> tags."""
+        if not self.timepoints:
+            raise RuntimeError('GoogleTTSBackend needs timepoints=True for batched requests')
+        tts = self.texttospeech
+
+        request = tts.SynthesizeSpeechRequest(
+            input=tts.SynthesisInput(ssml=ssml),
+            voice=tts.VoiceSelectionParams(language_code=LANGUAGE_CODE, name=voice_name),
+            audio_config=tts.AudioConfig(
+                audio_encoding=tts.AudioEncoding.MP3,
+                speaking_rate=speaking_rate
+            ),
+            enable_time_pointing=[tts.SynthesizeSpeechRequest.TimepointType.SSML_MARK],
+        )
+        response = self.client.synthesize_speech(request=request)
+        timepoints = {tp.mark_name: tp.time_seconds for tp in response.timepoints}
+        return response.audio_content, timepoints
+
+
+class FakeTTSBackend:
+    """Offline backend returning silent MP3s after an injected delay.
+
+    `latency` and `jitter` are in seconds; `error_rate` is the probability
+    that a call raises TransientTTSError instead of returning audio, and
+    `drop_mark_rate` the probability that a batched request omits a mark
+    timepoint (exercising the single-word fallback).
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0, drop_mark_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_mark_rate = drop_mark_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _simulate_request(self, text):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+        time.sleep(delay)
+        if fail:
+            raise TransientTTSError(f"injected failure for '{text[:40]}'")
+
+    def synthesize(self, text, voice_name, speaking_rate=SPEAKING_RATE):
+        """Return a silent MP3 whose length scales with `text`."""
+        self._simulate_request(text)
+        return fake_mp3(fake_word_seconds(text, speaking_rate))
+
+    def synthesize_marked(self, ssml, voice_name, speaking_rate=SPEAKING_RATE):
+        """Return (silent MP3, {mark_name: seconds}) laid out like the SSML."""
+        self._simulate_request(ssml)
+        chunks = []
+        timepoints = {}
+        elapsed = 0.0
+        for match in SSML_TOKEN.finditer(ssml):
+            break_ms, mark, text = match.groups()
+            if mark is not None:
+                with self._lock:
+                    dropped = self._random.random() < self.drop_mark_rate
+                if not dropped:
+                    timepoints[mark] = elapsed
+                continue
+            if break_ms is not None:
+                chunk = fake_mp3(int(break_ms) / 1000)
+            elif text is not None and text.strip():
+                chunk = fake_mp3(fake_word_seconds(unescape(text), speaking_rate))
+            else:
+                continue
+            chunks.append(chunk)
+            elapsed += len(chunk) // FAKE_FRAME_SIZE * FAKE_FRAME_SECONDS
+        return b''.join(chunks), timepoints
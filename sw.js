@@ -0,0 +1,136 @@
+// Spelling Dictator service worker
+// Precaches the app shell on install and warms a grade's audio on request, using
+// precache-manifest.js from scripts/build_assets.py. Without the manifest it does nothing.
+try {
+    importScripts('precache-manifest.js');
+} catch (error) {
+    self.PRECACHE_MANIFEST = null;
+}
+
+const MANIFEST = self.PRECACHE_MANIFEST || { version: 'none', shell: [], audio: {} };
+const SHELL_CACHE = `spelling-shell-${MANIFEST.version}`;
+const AUDIO_CACHE = 'spelling-audio';
+const WARM_CONCURRENCY = 6;
+
+// Content hash of every known asset, by path relative to the scope
+const revisions = new Map();
+MANIFEST.shell.forEach(entry => revisions.set(entry.url, entry.revision));
+Object.values(MANIFEST.audio).forEach(entries => entries.forEach(entry => revisions.set(entry.url, entry.revision)));
+
+function cacheKey(url, revision) {
+    // Cache entries are keyed by content hash, so changed files are never served stale
+    return new URL(`${url}?__rev=${revision}`, self.registration.scope).href;
+}
+
+function relativePath(requestUrl) {
+    const scope = self.registration.scope;
+    if (!requestUrl.startsWith(scope)) return null;
+    const path = requestUrl.slice(scope.length).split(/[?#]/)[0];
+    return path === '' ? 'index.html' : path;
+}
+
+async function cacheEntries(cacheName, entries) {
+    const cache = await caches.open(cacheName);
+    const queue = [...entries];
+    const worker = async () => {
+        while (queue.length > 0) {
+            const entry = queue.shift();
+            const key = cacheKey(entry.url, entry.revision);
+            if (await cache.match(key)) continue;
+            try {
+                // The hashed URL lets scripts/serve.py (or any CDN) mark the response immutable
+                const response = await fetch(`${entry.url}?v=${entry.revision}`);
+                if (response.ok) await cache.put(key, response);
+            } catch (error) {
+                // Offline or missing; the file is fetched normally when played
+            }
+        }
+    };
+    await Promise.all(Array.from({ length: WARM_CONCURRENCY }, worker));
+}
+
+function gradeEntries(gradeLevel) {
+    // Prefer the single bundle (scripts/build_bundle.py) over the per-word files when it exists
+    const entries = MANIFEST.audio[gradeLevel] || [];
+    const bundle = entries.filter(entry => entry.url.endsWith('.bundle.mp3') || entry.url.endsWith('.index.json'));
+    return bundle.length === 2 ? bundle : entries.filter(entry => !bundle.includes(entry));
+}
+
+async function rangeResponse(cached, rangeHeader) {
+    // Media elements (Safari/iOS in particular) send Range requests and need a 206 reply
+    const match = /^bytes=(\d*)-(\d*)$/.exec(rangeHeader.trim());
+    if (!match || (match[1] === '' && match[2] === '')) return cached;
+    const body = await cached.blob();
+    const size = body.size;
+    let start;
+    let end;
+    if (match[1] === '') {
+        // Suffix range: the last N bytes
+        start = Math.max(0, size - Number(match[2]));
+        end = size - 1;
+    } else {
+        start = Number(match[1]);
+        end = match[2] === '' ? size - 1 : Math.min(Number(match[2]), size - 1);
+    }
+    if (start >= size || end < start) {
+        return new Response(null, { status: 416, headers: { 'Content-Range': `bytes */${size}` } });
+    }
+    const headers = new Headers(cached.headers);
+    headers.set('Content-Range', `bytes ${start}-${end}/${size}`);
+    headers.set('Content-Length', String(end - start + 1));
+    return new Response(body.slice(start, end + 1), { status: 206, statusText: 'Partial Content', headers });
+}
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(cacheEntries(SHELL_CACHE, MANIFEST.shell).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names
+            .filter(name => name.startsWith('spelling-shell-') && name !== SHELL_CACHE)
+            .map(name => caches.delete(name)));
+
+        // Drop audio whose content hash is no longer in the manifest
+        const audio = await caches.open(AUDIO_CACHE);
+        const current = new Set([...revisions].map(([url, revision]) => cacheKey(url, revision)));
+        const keys = await audio.keys();
+        await Promise.all(keys.filter(request => !current.has(request.url)).map(request => audio.delete(request)));
+        await self.clients.claim();
+    })());
+});
+
+self.addEventListener('message', (event) => {
+    if (event.data && event.data.type === 'warm-grade') {
+        // Reply with the cache keys of the grade's files, so the page can read them from the cache
+        const entries = gradeEntries(event.data.gradeLevel);
+        event.waitUntil(cacheEntries(AUDIO_CACHE, entries).then(() => {
+            const cached = {};
+            entries.forEach((entry) => { cached[entry.url] = cacheKey(entry.url, entry.revision); });
+            if (event.ports[0]) event.ports[0].postMessage({ type: 'warmed', cached });
+        }));
+    }
+});
+
+self.addEventListener('fetch', (event) => {
+    if (event.request.method !== 'GET') return;
+    const path = relativePath(event.request.url);
+    const revision = path && revisions.get(path);
+    if (!revision) return;
+
+    event.respondWith((async () => {
+        const key = cacheKey(path, revision);
+        const cached = await caches.match(key);
+        const rangeHeader = event.request.headers.get('Range');
+        if (cached) return rangeHeader ? rangeResponse(cached, rangeHeader) : cached;
+        const response = await fetch(event.request);
+        // Partial (206) replies to Range requests are passed through, not cached
+        if (response.status === 200) {
+            const cacheName = path.startsWith('audio/') ? AUDIO_CACHE : SHELL_CACHE;
+            const copy = response.clone();
+            event.waitUntil(caches.open(cacheName).then(cache => cache.put(key, copy)));
+        }
+        return response;
+    })());
+});